@@ -1,41 +1,175 @@
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.html import format_html
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
+from api_store.analytics import record_sales
 from api_store.models import Product, ProductReview, ProductCollection, Position, Order
+from api_store.pagination import ApproximateCountPaginator
+from api_store.search import search_products
+from api_store.totals import refresh_order_totals
+
+ORDER_PRODUCT_LOOKUP = 'positions__product__id__exact'
+
+
+class ExactSearchMixin:
+    """
+    Поиск в админке по точному совпадению индексированных полей вместо icontains
+    по всем search_fields: число ищется по search_id_fields, строка - по search_exact_fields.
+    """
+    search_id_fields = ('id',)
+    search_exact_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        condition = Q()
+        if term.isdigit():
+            for field in self.search_id_fields:
+                condition |= Q(**{field: int(term)})
+        for field in self.search_exact_fields:
+            condition |= Q(**{field: term})
+        return queryset.filter(condition) if condition else queryset.none(), False
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Список без точного COUNT(*) всей таблицы.
+    """
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+
+
+class PrefetchedAutocompleteSelect(AutocompleteSelect):
+    """
+    AutocompleteSelect, который берёт выбранный объект из prefetched (id -> объект),
+    а не выполняет запрос для каждой строки inline.
+    """
+    prefetched = None
+
+    def optgroups(self, name, value, attr=None):
+        selected = [str(item) for item in value if str(item) not in self.choices.field.empty_values]
+        if self.prefetched is None or any(item not in self.prefetched for item in selected):
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        for item in selected:
+            obj = self.prefetched[item]
+            options.append(self.create_option(
+                name, obj.pk, self.choices.field.label_from_instance(obj), True, len(options),
+            ))
+        return [(None, options, 0)]
+
+
+class PositionInlineFormSet(BaseInlineFormSet):
+    """
+    Товары всех позиций берутся из queryset формы (select_related), а не по запросу на строку.
+    """
+
+    @cached_property
+    def products(self):
+        return {str(position.product_id): position.product for position in self.get_queryset()}
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        widget = form.fields['product'].widget
+        getattr(widget, 'widget', widget).prefetched = self.products
 
 
 class PositionInline(admin.TabularInline):
     model = Position
+    formset = PositionInlineFormSet
+    extra = 0
+    autocomplete_fields = ['product']
+    readonly_fields = ['unit_price', 'total_price']
+
+    def get_queryset(self, request):
+        # Position.__str__ выводится в каждой строке и обращается к заказу и товару.
+        return super().get_queryset(request).select_related('order', 'product')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'product':
+            kwargs['widget'] = PrefetchedAutocompleteSelect(db_field, self.admin_site, using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
-    inlines = [PositionInline]
+class ProductAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'price', 'rating_avg', 'reviews_count', 'updated_at')
+    search_fields = ('name',)
+    readonly_fields = ('orders_link',)
+
+    @admin.display(description='Заказы с товаром')
+    def orders_link(self, obj):
+        # Вместо inline позиций (у популярного товара их миллионы) - ссылка на постраничный
+        # список заказов, отфильтрованный по товару.
+        if obj.pk is None:
+            return '-'
+        url = reverse('admin:api_store_order_changelist')
+        return format_html('<a href="{}?{}={}">Открыть список заказов</a>', url, ORDER_PRODUCT_LOOKUP, obj.pk)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Поиск по search_vector (GIN-индекс) и по id; используется и автодополнением товаров.
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            matches = search_products(queryset, term).values('pk')
+            return queryset.filter(Q(id=int(term)) | Q(pk__in=matches)), False
+        return search_products(queryset, term), False
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(ExactSearchMixin, LargeTableAdmin):
     inlines = [PositionInline]
     readonly_fields = ['total_amount']
+    raw_id_fields = ['user']
+    list_display = ('id', 'user', 'status', 'total_amount', 'created_at', 'updated_at')
+    list_select_related = ('user',)
+    list_filter = ('status',)
+    search_fields = ('id', 'user__username')
+    search_exact_fields = ('user__username',)
+
+    def lookup_allowed(self, lookup, value):
+        # Фильтр по товару позиций - для ссылки со страницы товара.
+        return lookup == ORDER_PRODUCT_LOOKUP or super().lookup_allowed(lookup, value)
 
     def save_model(self, request, obj, form, change):
+        # Прежнее состояние заказа вычитается из витрин продаж, новое добавляется в save_related.
+        if change:
+            record_sales(Order.objects.filter(pk=obj.pk), sign=-1)
         super().save_model(request, obj, form, change)
-        self.saved_obj = obj
 
-    def _changeform_view(self, request, object_id, form_url, extra_context):
-        ret = super()._changeform_view(request, object_id, form_url, extra_context)
-        if hasattr(self, 'saved_obj'):
-            self.saved_obj.total_amount = sum(
-                p.product.price * p.quantity
-                for p in self.saved_obj.positions.all()
-            )
-            self.saved_obj.save()
-        return ret
+    def save_related(self, request, form, formsets, change):
+        """
+        Сумма заказа пересчитывается одним UPDATE после сохранения позиций.
+        """
+        super().save_related(request, form, formsets, change)
+        orders = Order.objects.filter(pk=form.instance.pk)
+        refresh_order_totals(orders)
+        record_sales(orders)
 
 
 @admin.register(ProductReview)
-class ProductAdmin(admin.ModelAdmin):
-    pass
+class ProductReviewAdmin(ExactSearchMixin, LargeTableAdmin):
+    raw_id_fields = ['user']
+    autocomplete_fields = ['product']
+    list_display = ('id', 'product', 'user', 'rating', 'created_at')
+    list_select_related = ('product', 'user')
+    list_filter = ('rating',)
+    search_fields = ('product__id', 'user__username')
+    search_id_fields = ('id', 'product_id')
+    search_exact_fields = ('user__username',)
 
 
 @admin.register(ProductCollection)
-class ProductAdmin(admin.ModelAdmin):
-    pass
+class ProductCollectionAdmin(admin.ModelAdmin):
+    autocomplete_fields = ['products']
+    list_display = ('id', 'title', 'updated_at')
+    search_fields = ('title',)
@@ -0,0 +1,200 @@
+"""
+Витрины продаж по дням (DailyProductSales, DailyOrderStats).
+
+Витрины обновляются приращениями: для изменяемых заказов агрегаты считаются
+запросом с GROUP BY до изменения (со знаком минус) и после него, и суммарная
+разница добавляется к строкам витрин одним INSERT ... ON CONFLICT DO UPDATE.
+rebuild_sales_rollups пересчитывает витрины по исходным таблицам за диапазон дней.
+"""
+import datetime
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.db.models import Count, DecimalField, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from api_store.models import DailyOrderStats, DailyProductSales, Order, Position
+
+REBUILD_DAYS_BATCH = 31
+ZERO = Decimal('0.00')
+
+
+def get_day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def order_stats(orders):
+    """
+    Агрегаты заказов по (день, статус).
+    """
+    return (
+        orders
+        .order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'status')
+        .annotate(
+            orders_count=Count('id'),
+            revenue=Coalesce(Sum('total_amount'), Value(ZERO), output_field=DecimalField()),
+        )
+    )
+
+
+def product_sales(orders):
+    """
+    Агрегаты позиций заказов по (день, товар).
+    """
+    return (
+        Position.objects.using(orders.db)
+        .filter(order__in=orders.order_by().values('pk'))
+        .order_by()
+        .annotate(day=TruncDate('order__created_at'))
+        .values('day', 'product_id')
+        .annotate(
+            units=Sum('quantity'),
+            revenue=Coalesce(Sum('total_price'), Value(ZERO), output_field=DecimalField()),
+            orders_count=Count('order', distinct=True),
+        )
+    )
+
+
+class SalesDelta:
+    """
+    Накопленные изменения витрин. Строки с нулевой разницей не записываются.
+    """
+
+    def __init__(self, using='default'):
+        self.using = using
+        self.products = defaultdict(lambda: [0, ZERO, 0])
+        self.statuses = defaultdict(lambda: [0, ZERO])
+
+    def add(self, orders, sign=1, products=True):
+        for row in order_stats(orders):
+            stats = self.statuses[(row['day'], row['status'])]
+            stats[0] += sign * row['orders_count']
+            stats[1] += sign * row['revenue']
+        if not products:
+            return
+        for row in product_sales(orders):
+            sales = self.products[(row['day'], row['product_id'])]
+            sales[0] += sign * row['units']
+            sales[1] += sign * row['revenue']
+            sales[2] += sign * row['orders_count']
+
+    def apply(self):
+        # Строки записываются в порядке ключей, чтобы параллельные транзакции блокировали их в одном порядке.
+        self.upsert(DailyOrderStats, ('day', 'status'), ('orders_count', 'revenue'), self.statuses)
+        self.upsert(DailyProductSales, ('day', 'product_id'), ('units', 'revenue', 'orders_count'), self.products)
+
+    def upsert(self, model, key_columns, value_columns, deltas):
+        connection = connections[self.using]
+        rows = [
+            (connection.ops.adapt_datefield_value(key[0]), *key[1:], *values)
+            for key, values in sorted(deltas.items()) if any(values)
+        ]
+        if not rows:
+            return
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        columns = key_columns + value_columns
+        updates = ', '.join(f'{quote(column)} = {table}.{quote(column)} + EXCLUDED.{quote(column)}' for column in value_columns)
+        batch_size = connection.ops.bulk_batch_size([model._meta.get_field(column) for column in columns], rows)
+        placeholder = f"({', '.join(['%s'] * len(columns))})"
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                cursor.execute(
+                    f"INSERT INTO {table} ({', '.join(quote(column) for column in columns)}) "
+                    f"VALUES {', '.join([placeholder] * len(batch))} "
+                    f"ON CONFLICT ({', '.join(quote(column) for column in key_columns)}) DO UPDATE SET {updates}",
+                    [value for row in batch for value in row],
+                )
+
+
+def lock_orders(orders):
+    """
+    Блокировка строк заказов из queryset до конца транзакции (в порядке id, чтобы
+    параллельные транзакции не блокировали друг друга крест-накрест).
+    """
+    list(orders.order_by('pk').select_for_update().values_list('pk', flat=True))
+
+
+def record_sales(orders, sign=1, products=True):
+    """
+    Добавление заказов из queryset в витрины (sign=-1 - вычитание, например перед удалением).
+
+    При вычитании заказы блокируются: до конца транзакции их не изменит другой запрос,
+    и вычтенное состояние совпадает с тем, что будет изменено или удалено.
+    """
+    delta = SalesDelta(using=orders.db)
+    with transaction.atomic(using=orders.db):
+        if sign < 0:
+            lock_orders(orders)
+        delta.add(orders, sign=sign, products=products)
+        delta.apply()
+
+
+@contextmanager
+def track_sales(orders, products=True):
+    """
+    Изменение заказов из queryset вместе с витринами в одной транзакции:
+    заказы блокируются, их агрегаты вычитаются до блока и прибавляются после.
+
+    Набор заказов в queryset не должен зависеть от изменений внутри блока
+    (например, фильтр по id, а не по изменяемому статусу). products=False,
+    если меняются только статусы.
+    """
+    delta = SalesDelta(using=orders.db)
+    with transaction.atomic(using=orders.db):
+        lock_orders(orders)
+        delta.add(orders, sign=-1, products=products)
+        yield orders
+        delta.add(orders, sign=1, products=products)
+        delta.apply()
+
+
+def rebuild_sales_rollups(date_from=None, date_to=None, days_batch=REBUILD_DAYS_BATCH, using='default'):
+    """
+    Пересчёт витрин по заказам и позициям за дни [date_from, date_to] пакетами по days_batch дней;
+    без границ - за весь период заказов. Каждый пакет заменяется в своей транзакции.
+    Возвращает число записанных строк витрин.
+    """
+    orders = Order.objects.using(using).order_by()
+    if date_from is None or date_to is None:
+        # Границы берутся и из витрин: строки за дни, где заказов уже нет, тоже удаляются.
+        days = [
+            timezone.localdate(value) if isinstance(value, datetime.datetime) else value
+            for queryset, field in (
+                (orders, 'created_at'),
+                (DailyOrderStats.objects.using(using), 'day'),
+                (DailyProductSales.objects.using(using), 'day'),
+            )
+            for value in (
+                queryset.order_by(field).values_list(field, flat=True).first(),
+                queryset.order_by(f'-{field}').values_list(field, flat=True).first(),
+            )
+            if value is not None
+        ]
+        if not days:
+            return 0
+        date_from = date_from or min(days)
+        date_to = date_to or max(days)
+    written = 0
+    start = date_from
+    while start <= date_to:
+        end = min(start + datetime.timedelta(days=days_batch - 1), date_to)
+        batch = orders.filter(
+            created_at__gte=get_day_start(start),
+            created_at__lt=get_day_start(end + datetime.timedelta(days=1)),
+        )
+        with transaction.atomic(using=using):
+            DailyOrderStats.objects.using(using).filter(day__range=(start, end)).delete()
+            DailyProductSales.objects.using(using).filter(day__range=(start, end)).delete()
+            stats = [DailyOrderStats(**row) for row in order_stats(batch)]
+            sales = [DailyProductSales(**row) for row in product_sales(batch)]
+            DailyOrderStats.objects.using(using).bulk_create(stats)
+            DailyProductSales.objects.using(using).bulk_create(sales)
+        written += len(stats) + len(sales)
+        start = end + datetime.timedelta(days=1)
+    return written
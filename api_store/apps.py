@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ApiStoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api_store'
+
+    def ready(self):
+        from django.core.signals import request_started
+        from api_store import signals  # noqa: F401
+        from api_store.db import check_connections_health
+        request_started.connect(check_connections_health, dispatch_uid='api_store_check_connections_health')
@@ -0,0 +1,153 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+TOKEN_AUTH_CACHE_DEFAULTS = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+    'CACHE_ALIAS': None,
+    'KEY_PREFIX': 'api_store:token:',
+}
+
+
+def get_token_cache_settings():
+    return {**TOKEN_AUTH_CACHE_DEFAULTS, **getattr(settings, 'TOKEN_AUTH_CACHE', {})}
+
+
+class TTLCache:
+    """
+    Потокобезопасный LRU-кэш в памяти процесса с ограничением времени жизни записей.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = (time.monotonic() + self.ttl, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication с кэшированием token -> user.
+
+    Если задан TOKEN_AUTH_CACHE['CACHE_ALIAS'], записи хранятся только в общем Django-кэше,
+    иначе - в LRU-кэше процесса; при промахе токен читается из базы. Удаление токена и
+    сохранение пользователя сбрасывают запись сигналами (api_store.signals). Без общего кэша
+    сброс виден только текущему процессу: в других воркерах отозванный токен или
+    деактивированный пользователь проходят аутентификацию ещё до TTL секунд.
+    """
+    local_cache = None
+    counters = {'hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    @classmethod
+    def get_local_cache(cls):
+        if cls.local_cache is None:
+            options = get_token_cache_settings()
+            cls.local_cache = TTLCache(options['MAX_SIZE'], options['TTL'])
+        return cls.local_cache
+
+    @classmethod
+    def get_shared_cache(cls):
+        alias = get_token_cache_settings()['CACHE_ALIAS']
+        return caches[alias] if alias else None
+
+    @classmethod
+    def get_shared_key(cls, key):
+        return get_token_cache_settings()['KEY_PREFIX'] + key
+
+    @classmethod
+    def stats(cls):
+        """
+        Счётчики попаданий в локальный и общий кэш и обращений к базе.
+        """
+        return dict(cls.counters)
+
+    @classmethod
+    def invalidate(cls, *keys):
+        shared_cache = cls.get_shared_cache()
+        for key in keys:
+            cls.get_local_cache().delete(key)
+            if shared_cache is not None:
+                shared_cache.delete(cls.get_shared_key(key))
+
+    @classmethod
+    def invalidate_user(cls, user_id):
+        cls.invalidate(*Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+
+    @classmethod
+    def clear(cls):
+        cls.get_local_cache().clear()
+        cls.counters.update(hits=0, shared_hits=0, misses=0)
+
+    def authenticate_credentials(self, key):
+        shared_cache = self.get_shared_cache()
+        if shared_cache is not None:
+            # С общим кэшем локальный уровень не используется: сброс в одном процессе
+            # не дошёл бы до локальных копий в других.
+            shared_key = self.get_shared_key(key)
+            token = shared_cache.get(shared_key)
+            if token is not None:
+                self.counters['shared_hits'] += 1
+            else:
+                self.counters['misses'] += 1
+                token = self.load_token(key)
+                shared_cache.set(shared_key, token, get_token_cache_settings()['TTL'])
+        else:
+            local_cache = self.get_local_cache()
+            token = local_cache.get(key)
+            if token is not None:
+                self.counters['hits'] += 1
+            else:
+                self.counters['misses'] += 1
+                token = self.load_token(key)
+                local_cache.set(key, token)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        # Копии, чтобы изменения request.user в одном запросе не попадали в кэш.
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return token.user, token
+
+    def load_token(self, key):
+        model = self.get_model()
+        try:
+            return model.objects.select_related('user').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
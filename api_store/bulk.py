@@ -0,0 +1,108 @@
+import json
+from itertools import islice
+
+from django.db import connections, router, transaction
+from api_store.analytics import record_sales
+from api_store.models import Order, OrderStatusChoices, Position, Product
+from api_store.serializers import OrderSerializer
+from api_store.totals import refresh_order_totals
+
+IMPORT_BATCH_SIZE = 500
+POSITIONS_BATCH_SIZE = 1000
+
+
+def iter_ndjson(stream):
+    """
+    Построчное чтение NDJSON из потока запроса: (номер строки, объект или None).
+    Пустые строки пропускаются, тело запроса целиком в память не читается.
+    """
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+def iter_batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def collect_product_ids(batch):
+    product_ids = set()
+    for _, data in batch:
+        if not isinstance(data, dict) or not isinstance(data.get('products'), list):
+            continue
+        for position in data['products']:
+            if isinstance(position, dict) and isinstance(position.get('product'), int):
+                product_ids.add(position['product'])
+    return product_ids
+
+
+def insert_orders(orders, positions):
+    """
+    Пакетная вставка заказов и их позиций; суммы заказов пакета считаются одним UPDATE,
+    витрины продаж пополняются агрегатами пакета.
+    Если СУБД не возвращает id из bulk INSERT (SQLite), заказы сохраняются по одному.
+    """
+    connection = connections[router.db_for_write(Order)]
+    if connection.features.can_return_rows_from_bulk_insert:
+        Order.objects.bulk_create(orders)
+    else:
+        for order in orders:
+            order.save(force_insert=True)
+    to_save = []
+    for order, order_positions in zip(orders, positions):
+        to_save.extend(OrderSerializer.build_positions(order.id, order_positions))
+    Position.objects.bulk_create(to_save, batch_size=POSITIONS_BATCH_SIZE)
+    if orders:
+        created = Order.objects.filter(pk__in=[order.id for order in orders])
+        refresh_order_totals(created)
+        record_sales(created)
+
+
+def import_orders(stream, request, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Импорт заказов из NDJSON-потока в формате OrderSerializer.
+
+    Строки валидируются пакетами: товары всех строк пакета загружаются одним
+    запросом, валидные заказы пакета вставляются в одной транзакции.
+    Для каждой строки отдаётся результат: id созданного заказа или ошибки.
+    """
+    for batch in iter_batches(iter_ndjson(stream), batch_size):
+        context = {
+            'request': request,
+            'products': Product.objects.only('id', 'price').in_bulk(collect_product_ids(batch)),
+        }
+        results = []
+        orders = []
+        positions = []
+        for line_number, data in batch:
+            if not isinstance(data, dict):
+                results.append({'line': line_number, 'errors': {'non_field_errors': ['Строка не является JSON-объектом']}})
+                continue
+            serializer = OrderSerializer(data=data, context=context)
+            if not serializer.is_valid():
+                results.append({'line': line_number, 'errors': serializer.errors})
+                continue
+            validated_data = serializer.validated_data
+            results.append({'line': line_number})
+            orders.append(Order(
+                user=request.user,
+                status=validated_data.get('status', OrderStatusChoices.NEW),
+            ))
+            positions.append(validated_data['positions'])
+        with transaction.atomic():
+            insert_orders(orders, positions)
+        created = iter(orders)
+        for result in results:
+            if 'errors' not in result:
+                result['id'] = next(created).id
+            yield json.dumps(result, ensure_ascii=False) + '\n'
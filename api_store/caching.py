@@ -0,0 +1,164 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+from api_store.routers import replica_reads
+
+RESPONSE_CACHE_DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+    'KEY_PREFIX': 'api_store:response:',
+}
+
+
+def get_response_cache_settings():
+    return {**RESPONSE_CACHE_DEFAULTS, **getattr(settings, 'RESPONSE_CACHE', {})}
+
+
+def get_cache():
+    return caches[get_response_cache_settings()['CACHE_ALIAS']]
+
+
+def get_version_key(namespace):
+    return f"{get_response_cache_settings()['KEY_PREFIX']}version:{namespace}"
+
+
+def get_versions(namespaces):
+    """
+    Текущие версии пространств имён кэша. Отсутствующая версия создаётся
+    из текущего времени, чтобы не совпасть с версией вытесненной записи.
+    """
+    cache = get_cache()
+    keys = {namespace: get_version_key(namespace) for namespace in namespaces}
+    stored = cache.get_many(keys.values())
+    versions = []
+    for namespace, key in keys.items():
+        if key not in stored:
+            cache.add(key, time.time_ns())
+            stored[key] = cache.get(key)
+        versions.append(f'{namespace}.{stored[key]}')
+    return versions
+
+
+def bump_versions(*namespaces):
+    cache = get_cache()
+    for namespace in namespaces:
+        key = get_version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def invalidate(*namespaces):
+    """
+    Сброс закэшированных ответов. Внутри транзакции версии увеличиваются ещё раз
+    после фиксации, чтобы отбросить ответы, закэшированные до COMMIT.
+    """
+    bump_versions(*namespaces)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_versions(*namespaces))
+
+
+def invalidate_product(product_id, collection_ids=()):
+    invalidate(
+        'product-list', f'product:{product_id}', 'collection-list',
+        *(f'collection:{collection_id}' for collection_id in collection_ids),
+    )
+
+
+def invalidate_collection(*collection_ids):
+    invalidate('collection-list', *(f'collection:{collection_id}' for collection_id in collection_ids))
+
+
+def normalize_query(query_params):
+    """
+    Канонический вид query string: параметры и значения отсортированы, пустые отброшены.
+    """
+    items = []
+    for key in sorted(query_params):
+        values = sorted(value for value in query_params.getlist(key) if value != '')
+        items.extend((key, value) for value in values)
+    return items
+
+
+class CachedResponseMixin:
+    """
+    Кэширование GET-ответов list/retrieve для анонимных пользователей.
+
+    Ключ строится из пути, нормализованных query params, формата ответа и версий
+    пространств имён, которые сигналы (api_store.signals) увеличивают при изменении
+    данных. При промахе ответ строится с основной базы, а не с реплики. Ответ
+    отдаётся с ETag, на If-None-Match отвечает 304. Last-Modified
+    не отдаётся: максимум updated_at не растёт при удалении записей, а точности
+    HTTP-даты в секунду не хватает, чтобы различать версии.
+    """
+    cache_list_namespaces = ()
+    cache_detail_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, self.cache_list_namespaces, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        namespaces = (f"{self.cache_detail_namespace}:{kwargs[lookup_url_kwarg]}",)
+        return self.cached_response(request, namespaces, super().retrieve, *args, **kwargs)
+
+    def is_cacheable(self, request):
+        return request.method == 'GET' and not request.user.is_authenticated
+
+    def get_cache_key(self, request, namespaces):
+        key = repr((
+            request.path,
+            normalize_query(request.query_params),
+            request.accepted_renderer.format,
+            get_versions(namespaces),
+        ))
+        return get_response_cache_settings()['KEY_PREFIX'] + hashlib.md5(key.encode()).hexdigest()
+
+    def cached_response(self, request, namespaces, handler, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = self.get_cache_key(request, namespaces)
+        entry = cache.get(key)
+        if entry is None:
+            # Ответ ляжет в кэш под новой версией на весь TIMEOUT, поэтому строится с основной
+            # базы: реплика могла ещё не получить изменение, сдвинувшее версию.
+            token = replica_reads.set(False)
+            try:
+                response = handler(request, *args, **kwargs)
+            finally:
+                replica_reads.reset(token)
+            if not isinstance(response, Response) or response.status_code != 200:
+                return response
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            entry = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': quote_etag(hashlib.md5(response.content).hexdigest()),
+            }
+            cache.set(key, entry, get_response_cache_settings()['TIMEOUT'])
+
+        if self.is_not_modified(request, entry):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        response['ETag'] = entry['etag']
+        return response
+
+    def is_not_modified(self, request, entry):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is None:
+            return False
+        etags = {etag.strip() for etag in if_none_match.split(',')}
+        return '*' in etags or entry['etag'] in etags or f"W/{entry['etag']}" in etags
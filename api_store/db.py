@@ -0,0 +1,38 @@
+from django.contrib.postgres import operations as postgres_operations
+from django.db import connections
+from django.db.migrations import AddIndex
+
+
+def check_connections_health(**kwargs):
+    """
+    Проверка постоянных соединений в начале запроса (CONN_HEALTH_CHECKS в DATABASES).
+
+    Django 3.2 закрывает соединение только по возрасту или после ошибки, поэтому
+    соединение, разорванное сервером или pgbouncer, ломало бы первый запрос воркера.
+    Неработающее соединение закрывается, и следующий запрос к базе откроет новое.
+    """
+    for connection in connections.all():
+        if connection.connection is None or not connection.settings_dict.get('CONN_HEALTH_CHECKS'):
+            continue
+        if connection.in_atomic_block:
+            continue
+        if not connection.is_usable():
+            connection.close()
+
+
+class AddIndexConcurrently(postgres_operations.AddIndexConcurrently):
+    """
+    CREATE INDEX CONCURRENTLY на PostgreSQL: индекс строится без блокировки записи
+    в таблицу. На остальных базах (тесты на SQLite) - обычный AddIndex.
+    Миграция с этой операцией должна быть неатомарной (atomic = False).
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
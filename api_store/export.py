@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def flatten(data, prefix=''):
+    """
+    Плоское представление объекта для CSV: вложенные словари раскрываются
+    в колонки вида user.id, списки сохраняются как JSON.
+    """
+    row = {}
+    for key, value in data.items():
+        column = f'{prefix}{key}'
+        if isinstance(value, dict):
+            row.update(flatten(value, prefix=f'{column}.'))
+        elif isinstance(value, list):
+            row[column] = json.dumps(value, cls=JSONEncoder, ensure_ascii=False)
+        else:
+            row[column] = value
+    return row
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renderer NDJSON: одна строка - один объект.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render_rows(self, rows):
+        return ''.join(json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + '\n' for row in rows)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return self.render_rows(rows).encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renderer CSV с плоскими колонками (см. flatten).
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render_rows(self, rows, header=True):
+        rows = [flatten(row) for row in rows]
+        if not rows:
+            return ''
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(rows[0]), extrasaction='ignore')
+        if header:
+            writer.writeheader()
+        writer.writerows(rows)
+        return buffer.getvalue()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return self.render_rows(rows).encode(self.charset)
+
+
+class StreamingExportMixin:
+    """
+    Выгрузка списка в NDJSON/CSV (?format=ndjson, ?format=csv) потоком.
+
+    Учитывает filterset_class и фильтрацию queryset во view. Записи читаются через
+    .iterator(chunk_size) (server-side cursor на PostgreSQL), связи подгружаются
+    по пачкам, поэтому память не зависит от количества строк.
+    """
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer, CSVRenderer]
+    export_renderer_classes = (NDJSONRenderer, CSVRenderer)
+    export_chunk_size = EXPORT_CHUNK_SIZE
+    export_prefetch_related = ()
+
+    def list(self, request, *args, **kwargs):
+        if isinstance(request.accepted_renderer, self.export_renderer_classes):
+            return self.export(request)
+        return super().list(request, *args, **kwargs)
+
+    def iter_export_chunks(self, queryset):
+        iterator = queryset.iterator(chunk_size=self.export_chunk_size)
+        while True:
+            chunk = list(islice(iterator, self.export_chunk_size))
+            if not chunk:
+                return
+            if self.export_prefetch_related:
+                prefetch_related_objects(chunk, *self.export_prefetch_related)
+            yield self.get_serializer(chunk, many=True).data
+
+    def export(self, request):
+        renderer = request.accepted_renderer
+        queryset = self.filter_queryset(self.get_queryset())
+
+        def content():
+            header = True
+            for rows in self.iter_export_chunks(queryset):
+                if isinstance(renderer, CSVRenderer):
+                    yield renderer.render_rows(rows, header=header)
+                    header = False
+                else:
+                    yield renderer.render_rows(rows)
+
+        response = StreamingHttpResponse(content(), content_type=f'{renderer.media_type}; charset={renderer.charset}')
+        response['Content-Disposition'] = f'attachment; filename="{self.basename}.{renderer.format}"'
+        return response
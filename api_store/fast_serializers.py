@@ -0,0 +1,140 @@
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.response import Response
+from api_store.models import Position
+from api_store.serializers import ProductSerializer, OrderSerializer, UserSerializer, PositionSerializer
+
+
+class ValuesSerializer:
+    """
+    Быстрое чтение: то же представление, что у serializer_class, но из строк
+    .values() без создания моделей.
+
+    Для каждого поля заранее (один раз на класс) определяется колонка и функция
+    преобразования - to_representation соответствующего поля DRF, поэтому вывод
+    совпадает с ModelSerializer байт в байт. Вложенные сериализаторы перечисляются
+    в nested_fields и собираются подклассом в get_nested().
+    """
+    serializer_class = None
+    nested_fields = ()
+    # Поля, значения которых из базы уже имеют нужный тип.
+    identity_field_classes = (serializers.IntegerField, serializers.CharField)
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    @classmethod
+    def get_fields(cls):
+        if '_fields' not in cls.__dict__:
+            cls._fields = cls.compile_fields()
+        return cls._fields
+
+    @classmethod
+    def compile_fields(cls):
+        model = cls.serializer_class.Meta.model
+        compiled = []
+        for name, field in cls.serializer_class().fields.items():
+            if name in cls.nested_fields:
+                compiled.append((name, None, None))
+                continue
+            if isinstance(field, serializers.BaseSerializer) or '.' in field.source or field.source == '*':
+                raise ImproperlyConfigured(f'{cls.__name__}: поле {name} нужно перечислить в nested_fields')
+            column = model._meta.get_field(field.source).attname
+            converter = None if type(field) in cls.identity_field_classes else field.to_representation
+            compiled.append((name, column, converter))
+        return compiled
+
+    @classmethod
+    def get_columns(cls):
+        return [column for _, column, _ in cls.get_fields() if column is not None]
+
+    @classmethod
+    def to_representation(cls, row, nested=None):
+        result = {}
+        for name, column, converter in cls.get_fields():
+            if column is None:
+                result[name] = nested[name]
+                continue
+            value = row[column]
+            if value is not None and converter is not None:
+                value = converter(value)
+            result[name] = value
+        return result
+
+    def get_extra_columns(self):
+        return []
+
+    def get_nested(self, rows):
+        """
+        Значения вложенных полей для каждой строки: список словарей той же длины, что rows.
+        """
+        return [None] * len(rows)
+
+    def get_rows(self):
+        columns = self.get_columns() + self.get_extra_columns()
+        return list(self.queryset.prefetch_related(None).values(*columns))
+
+    @property
+    def data(self):
+        rows = self.get_rows()
+        return [self.to_representation(row, nested) for row, nested in zip(rows, self.get_nested(rows))]
+
+
+class FastProductSerializer(ValuesSerializer):
+    serializer_class = ProductSerializer
+
+
+class FastUserSerializer(ValuesSerializer):
+    serializer_class = UserSerializer
+
+
+class FastPositionSerializer(ValuesSerializer):
+    serializer_class = PositionSerializer
+
+
+class FastOrderSerializer(ValuesSerializer):
+    """
+    Заказы с пользователем и позициями: три запроса на весь список.
+    Позиции выводятся в порядке id.
+    """
+    serializer_class = OrderSerializer
+    nested_fields = ('user', 'products')
+
+    def get_extra_columns(self):
+        return ['user_id']
+
+    def get_nested(self, rows):
+        user_ids = {row['user_id'] for row in rows}
+        users = {
+            row['id']: FastUserSerializer.to_representation(row)
+            for row in User.objects.filter(id__in=user_ids).values(*FastUserSerializer.get_columns())
+        }
+        positions = defaultdict(list)
+        position_rows = (
+            Position.objects
+            .filter(order_id__in=[row['id'] for row in rows])
+            .order_by('id')
+            .values('order_id', *FastPositionSerializer.get_columns())
+        )
+        for row in position_rows:
+            positions[row['order_id']].append(FastPositionSerializer.to_representation(row))
+        return [{'user': users.get(row['user_id']), 'products': positions[row['id']]} for row in rows]
+
+
+class FastListMixin:
+    """
+    list() через fast_serializer_class. Страницы пагинации небольшие и
+    сериализуются обычным serializer_class.
+    """
+    fast_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        return Response(self.fast_serializer_class(queryset).data)
@@ -1,5 +1,6 @@
 from django_filters import rest_framework as filters
-from api_store.models import Product, Order, OrderStatusChoices, ProductReview
+from api_store.models import DailyOrderStats, DailyProductSales, Product, Order, OrderStatusChoices, ProductReview
+from api_store.search import search_products
 
 
 class ProductFilter(filters.FilterSet):
@@ -10,10 +11,20 @@ class ProductFilter(filters.FilterSet):
     description = filters.CharFilter(lookup_expr='icontains', label='Описание')
     min_price = filters.NumberFilter(field_name="price", lookup_expr='gte', label='Цена от')
     max_price = filters.NumberFilter(field_name="price", lookup_expr='lte', label='Цена до')
+    min_rating = filters.NumberFilter(field_name="rating_avg", lookup_expr='gte', label='Средняя оценка от')
+    min_reviews_count = filters.NumberFilter(field_name="reviews_count", lookup_expr='gte', label='Отзывов не меньше')
+    q = filters.CharFilter(method='filter_search', label='Поиск')
+    ordering = filters.OrderingFilter(
+        fields=('price', 'rating_avg', 'reviews_count', 'updated_at'),
+        label='Сортировка',
+    )
 
     class Meta:
         model = Product
-        fields = ('name', 'description', 'min_price', 'max_price')
+        fields = ('name', 'description', 'min_price', 'max_price', 'min_rating', 'min_reviews_count', 'q')
+
+    def filter_search(self, queryset, name, value):
+        return search_products(queryset, value)
 
 
 class OrderFilter(filters.FilterSet):
@@ -40,3 +51,31 @@ class ProductReviewFilter(filters.FilterSet):
     class Meta:
         model = ProductReview
         fields = ('user_id', 'product_id', 'created_at')
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
+
+
+class DailyProductSalesFilter(filters.FilterSet):
+    """
+    FilterSet для витрины продаж товаров.
+    """
+    day = filters.DateFromToRangeFilter()
+    product = NumberInFilter(field_name='product_id', label='ID товаров через запятую')
+
+    class Meta:
+        model = DailyProductSales
+        fields = ('day', 'product')
+
+
+class DailyOrderStatsFilter(filters.FilterSet):
+    """
+    FilterSet для витрины заказов по статусам.
+    """
+    day = filters.DateFromToRangeFilter()
+    status = filters.ChoiceFilter(choices=OrderStatusChoices.choices, label='Статус заказа')
+
+    class Meta:
+        model = DailyOrderStats
+        fields = ('day', 'status')
@@ -0,0 +1,176 @@
+"""
+Потоковая загрузка фикстур Django (формат fixtures.json) пачками bulk_create.
+"""
+import gzip
+import json
+import time
+
+from django.core import serializers
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from api_store.analytics import rebuild_sales_rollups
+from api_store.caching import invalidate
+from api_store.models import Order, Position, Product, ProductReview
+from api_store.ratings import rebuild_product_ratings
+from api_store.search import update_product_search_vector
+from api_store.seeding import explicit_timestamps
+from api_store.totals import refresh_position_prices
+
+LOAD_BATCH_SIZE = 2000
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(stream, chunk_size=READ_CHUNK_SIZE):
+    """
+    Элементы JSON-массива верхнего уровня по одному: файл читается кусками,
+    в памяти держится только текущий элемент.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+
+    def skip(chars):
+        nonlocal buffer, position, eof
+        while True:
+            while position < len(buffer) and buffer[position] in chars:
+                position += 1
+            if position < len(buffer) or eof:
+                return
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+
+    skip(' \t\r\n')
+    if buffer[position:position + 1] != '[':
+        raise ValueError('Ожидается JSON-массив объектов')
+    position += 1
+    while True:
+        skip(' \t\r\n,')
+        if position >= len(buffer):
+            raise ValueError('Неожиданный конец файла')
+        if buffer[position] == ']':
+            return
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+                break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = stream.read(chunk_size)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+        yield item
+        buffer, position = buffer[end:], 0
+
+
+def sort_models(models):
+    """
+    Модели в порядке зависимостей по внешним ключам: сначала те, на которые ссылаются.
+    """
+    pending = list(models)
+    ordered = []
+    while pending:
+        for model in pending:
+            dependencies = {
+                field.related_model for field in model._meta.concrete_fields
+                if field.is_relation and field.related_model is not model
+            }
+            if not dependencies.intersection(pending):
+                break
+        else:
+            # Циклические зависимости: ограничения всё равно проверяются при COMMIT.
+            model = pending[0]
+        pending.remove(model)
+        ordered.append(model)
+    return ordered
+
+
+def open_fixture(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+class FixtureLoader:
+    """
+    Загрузка записей фикстуры без сигналов и построчных save().
+
+    Записи группируются по моделям в буферы по batch_size; заполненный буфер
+    вставляется bulk_create, остатки - в конце в порядке зависимостей моделей
+    (пользователи, товары, заказы, позиции, отзывы, подборки и их M2M). Всё
+    выполняется в одной транзакции: ограничения внешних ключей в PostgreSQL и SQLite
+    отложены до COMMIT и дополнительно проверяются check_constraints, поэтому
+    порядок записей в файле не важен. После загрузки сбрасываются последовательности
+    id и пересчитываются денормализованные поля товаров и витрины продаж.
+    """
+
+    def __init__(self, batch_size=LOAD_BATCH_SIZE, using='default'):
+        self.batch_size = batch_size
+        self.using = using
+        self.connection = connections[using]
+        self.buffers = {}
+        self.counts = {}
+
+    def add(self, model, instance):
+        buffer = self.buffers.setdefault(model, [])
+        buffer.append(instance)
+        if len(buffer) >= self.batch_size:
+            self.flush(model)
+
+    def add_m2m(self, instance, m2m_data):
+        for field_name, values in m2m_data.items():
+            field = instance._meta.get_field(field_name)
+            through = field.remote_field.through
+            # M2M с явной промежуточной моделью (Order.products) загружается её записями.
+            if not through._meta.auto_created:
+                continue
+            source = through._meta.get_field(field.m2m_field_name()).attname
+            target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+            for value in values:
+                self.add(through, through(**{source: instance.pk, target: value}))
+
+    def flush(self, model):
+        objects = self.buffers.pop(model, [])
+        if objects:
+            with explicit_timestamps(model):
+                model.objects.using(self.using).bulk_create(objects)
+            self.counts[model] = self.counts.get(model, 0) + len(objects)
+
+    def flush_all(self):
+        for model in sort_models(self.buffers):
+            self.flush(model)
+
+    def reset_sequences(self):
+        statements = self.connection.ops.sequence_reset_sql(no_style(), list(self.counts))
+        if statements:
+            with self.connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def refresh_denormalized(self):
+        if Product in self.counts or ProductReview in self.counts:
+            rebuild_product_ratings(using=self.using)
+        if Product in self.counts:
+            update_product_search_vector(Product.objects.using(self.using))
+        if Position in self.counts:
+            # Позиции из фикстур без снимка цены получают текущую цену товара.
+            refresh_position_prices(Position.objects.using(self.using).filter(unit_price__isnull=True))
+        if Order in self.counts or Position in self.counts:
+            rebuild_sales_rollups(using=self.using)
+        invalidate('product-list', 'collection-list')
+
+    def load(self, stream):
+        started = time.perf_counter()
+        records = serializers.deserialize('python', iter_json_array(stream), using=self.using)
+        with transaction.atomic(using=self.using):
+            for record in records:
+                self.add(type(record.object), record.object)
+                self.add_m2m(record.object, record.m2m_data)
+            self.flush_all()
+            self.connection.check_constraints(table_names=[model._meta.db_table for model in self.counts])
+            self.reset_sequences()
+            self.refresh_denormalized()
+        counts = {model: self.counts[model] for model in sort_models(self.counts)}
+        return counts, time.perf_counter() - started
@@ -0,0 +1,46 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержку запроса к базе с новым соединением на каждый запрос '
+        '(CONN_MAX_AGE = 0) и с постоянным соединением (CONN_MAX_AGE > 0).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--database', default='default')
+
+    def measure(self, connection, iterations, reconnect):
+        timings = []
+        for _ in range(iterations):
+            if reconnect:
+                connection.close()
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def report(self, title, timings):
+        timings = sorted(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(f'{title}: mean {statistics.mean(timings):.3f} ms, '
+                          f'p50 {statistics.median(timings):.3f} ms, p95 {p95:.3f} ms')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        iterations = options['iterations']
+        new_connections = self.measure(connection, iterations, reconnect=True)
+        persistent = self.measure(connection, iterations, reconnect=False)
+        connection.close()
+        self.report('Новое соединение на запрос', new_connections)
+        self.report('Постоянное соединение', persistent)
+        self.stdout.write(self.style.SUCCESS(
+            f'Экономия на запрос: {statistics.mean(new_connections) - statistics.mean(persistent):.3f} ms'
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from api_store.fixture_loader import LOAD_BATCH_SIZE, FixtureLoader, open_fixture
+
+
+class Command(BaseCommand):
+    help = (
+        'Быстрая загрузка фикстуры в формате loaddata (JSON, можно .gz): потоковый разбор '
+        'и bulk_create без сигналов. Записи с уже существующими id не обновляются - нужна пустая база.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixture')
+        parser.add_argument('--batch-size', type=int, default=LOAD_BATCH_SIZE)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        loader = FixtureLoader(batch_size=options['batch_size'], using=options['database'])
+        try:
+            with open_fixture(options['fixture']) as stream:
+                counts, elapsed = loader.load(stream)
+        except (OSError, ValueError, DatabaseError) as error:
+            raise CommandError(f"Не удалось загрузить {options['fixture']}: {error}")
+        for model, count in counts.items():
+            self.stdout.write(f'{model._meta.label}: {count}')
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено записей: {total} за {elapsed:.3f} с ({total / elapsed if elapsed else 0:.0f} записей/с)'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from api_store.ratings import REBUILD_BATCH_SIZE, rebuild_product_ratings
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает rating_sum, reviews_count и rating_avg всех товаров по таблице отзывов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        updated = rebuild_product_ratings(batch_size=options['batch_size'], using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f'Обновлено товаров: {updated}'))
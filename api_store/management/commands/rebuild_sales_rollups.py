@@ -0,0 +1,23 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from api_store.analytics import REBUILD_DAYS_BATCH, rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает витрины продаж по дням (товары и статусы заказов) по таблицам заказов и позиций.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', type=datetime.date.fromisoformat, help='первый день, YYYY-MM-DD')
+        parser.add_argument('--date-to', type=datetime.date.fromisoformat, help='последний день, YYYY-MM-DD')
+        parser.add_argument('--days-batch', type=int, default=REBUILD_DAYS_BATCH)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        written = rebuild_sales_rollups(
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+            days_batch=options['days_batch'],
+            using=options['database'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Записано строк витрин: {written}'))
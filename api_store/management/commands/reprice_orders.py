@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from api_store.models import OrderStatusChoices
+from api_store.totals import REPRICE_BATCH_SIZE, reprice_orders
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает total_amount открытых заказов по текущим ценам товаров на стороне базы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status', action='append', choices=OrderStatusChoices.values,
+            help=f'статусы пересчитываемых заказов (по умолчанию {OrderStatusChoices.NEW})',
+        )
+        parser.add_argument('--batch-size', type=int, default=REPRICE_BATCH_SIZE)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        updated = reprice_orders(
+            statuses=options['status'] or [OrderStatusChoices.NEW],
+            batch_size=options['batch_size'],
+            using=options['database'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Обновлено заказов: {updated}'))
@@ -0,0 +1,66 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from api_store.seeding import SEED_BATCH_SIZE, SEED_NOW, StoreSeeder
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, товарами, заказами, отзывами и подборками '
+        'с реалистичными распределениями. При одинаковом --seed данные совпадают.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--orders', type=int, default=50000)
+        parser.add_argument('--reviews', type=int, default=20000)
+        parser.add_argument('--collections', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=SEED_BATCH_SIZE)
+        parser.add_argument('--days', type=int, default=365, help='период, на который распределяются даты')
+        parser.add_argument(
+            '--now', default=SEED_NOW.isoformat(),
+            help='конец периода дат (ISO 8601); по умолчанию фиксирован, чтобы данные повторялись',
+        )
+        parser.add_argument('--zipf', type=float, default=1.1, help='показатель распределения популярности товаров')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['products'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь и один товар.')
+        try:
+            now = parse_datetime(options['now'])
+        except ValueError:
+            now = None
+        if now is None:
+            raise CommandError(f"Неверная дата --now: {options['now']}")
+        if timezone.is_naive(now):
+            now = timezone.make_aware(now)
+        if User.objects.using(options['database']).filter(username__startswith=f"seed_{options['seed']}_").exists():
+            raise CommandError(f"Данные с --seed {options['seed']} уже созданы, укажите другой seed.")
+
+        seeder = StoreSeeder(
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            days=options['days'],
+            zipf_exponent=options['zipf'],
+            now=now,
+            using=options['database'],
+        )
+        stats = seeder.run(
+            users=options['users'],
+            products=options['products'],
+            orders=options['orders'],
+            reviews=options['reviews'],
+            collections=options['collections'],
+        )
+        for item in stats:
+            self.stdout.write(f"{item['name']}: {item['rows']} строк за {item['seconds']} с "
+                              f"({item['rows_per_second']} строк/с)")
+        total_rows = sum(item['rows'] for item in stats)
+        total_seconds = sum(item['seconds'] for item in stats if item['name'] != 'positions')
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего: {total_rows} строк за {total_seconds:.3f} с ({total_rows / total_seconds:.0f} строк/с)'
+        ))
@@ -0,0 +1,353 @@
+import ipaddress
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager, suppress
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+METRICS_DEFAULTS = {
+    # Каталог для снимков метрик процессов (gunicorn workers). None - только текущий процесс.
+    'DIRECTORY': None,
+    'FLUSH_INTERVAL': 5,
+    # Адреса и сети, с которых доступен /metrics (кроме них - только staff-пользователям с сессией).
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+    'LATENCY_BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    'QUERY_BUCKETS': (0, 1, 2, 5, 10, 20, 50, 100),
+}
+
+METRICS_HELP = {
+    'api_requests_total': ('counter', 'Число запросов.'),
+    'api_request_duration_seconds': ('histogram', 'Время обработки запроса.'),
+    'api_db_queries': ('histogram', 'Число SQL-запросов на запрос.'),
+    'api_db_query_duration_seconds_total': ('counter', 'Суммарное время SQL-запросов.'),
+    'api_response_bytes_total': ('counter', 'Суммарный размер ответов.'),
+    'api_token_cache_total': ('counter', 'Обращения к кэшу токенов по результату.'),
+}
+
+
+def get_metrics_settings():
+    return {**METRICS_DEFAULTS, **getattr(settings, 'METRICS', {})}
+
+
+class MetricsRegistry:
+    """
+    Счётчики и гистограммы процесса.
+
+    Данные копятся в памяти под одной блокировкой. Если задан METRICS['DIRECTORY'],
+    процесс не чаще FLUSH_INTERVAL записывает свой снимок в <pid>.json, а /metrics
+    суммирует снимки всех процессов.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Запись снимка - под отдельной блокировкой: snapshot() сам берёт self.lock.
+        self.flush_lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.pid = os.getpid()
+        self.counters = {}
+        self.histograms = {}
+        self.flushed_at = 0
+
+    def check_fork(self):
+        # После fork дочерний процесс не должен повторно отдавать данные родителя.
+        if self.pid != os.getpid():
+            self.clear()
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, buckets, value):
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = [[0] * len(buckets), 0, 0]
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                histogram[0][index] += 1
+                break
+        histogram[1] += value
+        histogram[2] += 1
+
+    def observe_request(self, endpoint, method, status, duration, queries, query_duration, response_bytes):
+        options = get_metrics_settings()
+        labels = (('endpoint', endpoint), ('method', method))
+        with self.lock:
+            self.check_fork()
+            self.inc('api_requests_total', labels + (('status', str(status)),))
+            self.observe('api_request_duration_seconds', labels, options['LATENCY_BUCKETS'], duration)
+            self.observe('api_db_queries', labels, options['QUERY_BUCKETS'], queries)
+            self.inc('api_db_query_duration_seconds_total', labels, query_duration)
+            self.inc('api_response_bytes_total', labels, response_bytes)
+        self.flush()
+
+    def snapshot(self):
+        from api_store.authentication import CachedTokenAuthentication
+
+        with self.lock:
+            self.check_fork()
+            counters = [[name, list(labels), value] for (name, labels), value in self.counters.items()]
+            histograms = [
+                [name, list(labels), list(buckets), total, count]
+                for (name, labels), (buckets, total, count) in self.histograms.items()
+            ]
+        counters.extend(
+            ['api_token_cache_total', [['result', result]], value]
+            for result, value in CachedTokenAuthentication.stats().items()
+        )
+        return {'counters': counters, 'histograms': histograms}
+
+    def get_snapshot_path(self, directory):
+        return os.path.join(directory, f'{os.getpid()}.json')
+
+    def flush(self, force=False):
+        """
+        Запись снимка во временный файл и атомарная замена <pid>.json.
+        Ошибки записи только логируются.
+        """
+        options = get_metrics_settings()
+        directory = options['DIRECTORY']
+        if not directory:
+            return
+        with self.flush_lock:
+            if not force and time.monotonic() - self.flushed_at < options['FLUSH_INTERVAL']:
+                return
+            self.flushed_at = time.monotonic()
+            try:
+                os.makedirs(directory, exist_ok=True)
+                descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            except OSError:
+                logger.exception('Не удалось записать снимок метрик в %s', directory)
+                return
+            try:
+                with os.fdopen(descriptor, 'w', encoding='utf-8') as snapshot_file:
+                    json.dump(self.snapshot(), snapshot_file)
+                os.replace(temp_path, self.get_snapshot_path(directory))
+            except OSError:
+                logger.exception('Не удалось записать снимок метрик в %s', directory)
+                with suppress(OSError):
+                    os.unlink(temp_path)
+
+    def collect(self):
+        """
+        Снимок текущего процесса или сумма снимков всех процессов из METRICS['DIRECTORY'].
+        """
+        directory = get_metrics_settings()['DIRECTORY']
+        if not directory:
+            return self.snapshot()
+        self.flush(force=True)
+        snapshots = []
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(directory, name), encoding='utf-8') as snapshot_file:
+                        snapshots.append(json.load(snapshot_file))
+                except (OSError, ValueError):
+                    continue
+        return merge_snapshots(snapshots)
+
+
+def merge_snapshots(snapshots):
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, total, count in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [[0] * len(buckets), 0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+            merged[2] += count
+    return {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [
+            [name, list(labels), buckets, total, count]
+            for (name, labels), (buckets, total, count) in histograms.items()
+        ],
+    }
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics(snapshot):
+    """
+    Текстовый формат Prometheus (exposition format 0.0.4).
+    """
+    options = get_metrics_settings()
+    bucket_bounds = {
+        'api_request_duration_seconds': options['LATENCY_BUCKETS'],
+        'api_db_queries': options['QUERY_BUCKETS'],
+    }
+    samples = {}
+    for name, labels, value in snapshot['counters']:
+        samples.setdefault(name, []).append(f'{name}{format_labels(labels)} {format_value(value)}')
+    for name, labels, buckets, total, count in snapshot['histograms']:
+        lines = samples.setdefault(name, [])
+        cumulative = 0
+        for bound, bucket in zip(bucket_bounds[name], buckets):
+            cumulative += bucket
+            lines.append(f"{name}_bucket{format_labels(labels + [['le', format_value(bound)]])} {cumulative}")
+        lines.append(f"{name}_bucket{format_labels(labels + [['le', '+Inf']])} {count}")
+        lines.append(f'{name}_sum{format_labels(labels)} {format_value(total)}')
+        lines.append(f'{name}_count{format_labels(labels)} {count}')
+    output = []
+    for name, (metric_type, help_text) in METRICS_HELP.items():
+        if name in samples:
+            output.append(f'# HELP {name} {help_text}')
+            output.append(f'# TYPE {name} {metric_type}')
+            output.extend(sorted(samples[name]))
+    return '\n'.join(output) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def get_endpoint(request):
+    """
+    Имя маршрута (products-list, orders-detail...) или unmatched для 404 без маршрута.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return 'unmatched'
+    return match.view_name
+
+
+class QueryCounter:
+    """
+    Число и суммарное время SQL-запросов всех соединений, выполненных внутри capture().
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.duration += time.perf_counter() - started
+
+    @contextmanager
+    def capture(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield
+
+
+class MeteredStream:
+    """
+    Обёртка streaming_content: SQL-запросы при чтении тела учитываются, а запрос
+    записывается в метрики, когда поток прочитан до конца или закрыт сервером.
+    """
+
+    def __init__(self, content, counter, on_close):
+        self.iterator = iter(content)
+        self.counter = counter
+        self.on_close = on_close
+        self.response_bytes = 0
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            with self.counter.capture():
+                chunk = next(self.iterator)
+        except StopIteration:
+            self.close()
+            raise
+        self.response_bytes += len(chunk)
+        return chunk
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.on_close(self.response_bytes)
+
+
+class MetricsMiddleware:
+    """
+    Метрики запросов по маршрутам: число, время, SQL-запросы (через execute_wrapper
+    всех соединений) и размер ответа. Потоковые ответы учитываются после чтения тела.
+    Сам /metrics не учитывается.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with counter.capture():
+            response = self.get_response(request)
+
+        endpoint = get_endpoint(request)
+        if endpoint == 'metrics':
+            return response
+
+        def observe(response_bytes):
+            try:
+                registry.observe_request(
+                    endpoint, request.method, response.status_code, time.perf_counter() - started,
+                    counter.queries, counter.duration, response_bytes,
+                )
+            except Exception:
+                # Сбой метрик не должен ломать ответ.
+                logger.exception('Не удалось учесть запрос в метриках')
+
+        if response.streaming:
+            response.streaming_content = MeteredStream(response.streaming_content, counter, observe)
+        else:
+            observe(len(response.content))
+        return response
+
+
+def is_metrics_allowed(request):
+    """
+    Доступ к /metrics: с адресов METRICS['ALLOWED_IPS'] (адрес или сеть, например 10.0.0.0/8)
+    или для staff-пользователя. За прокси REMOTE_ADDR - адрес прокси.
+    """
+    if getattr(request, 'user', None) is not None and request.user.is_staff:
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in get_metrics_settings()['ALLOWED_IPS']
+    )
+
+
+def metrics_view(request):
+    if not is_metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(registry.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,29 @@
+# Generated by Django 3.2 on 2026-10-17 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-updated_at', '-created_at', '-id'], name='order_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-updated_at', '-created_at', '-id'], name='product_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productcollection',
+            index=models.Index(fields=['-updated_at', '-created_at', '-id'], name='collection_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productreview',
+            index=models.Index(fields=['-updated_at', '-created_at', '-id'], name='review_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 3.2 on 2026-10-17 01:03
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def fill_search_vector(apps, schema_editor):
+    """
+    Заполнение search_vector существующих товаров пакетами по id.
+
+    Миграция неатомарная: каждый пакет - отдельный UPDATE в своей транзакции, поэтому
+    блокируются только строки пакета, а прерванная миграция при повторном запуске
+    продолжает с незаполненных товаров.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Product = apps.get_model('api_store', 'Product')
+    products = Product.objects.using(schema_editor.connection.alias).order_by('id')
+    vector = SearchVector('name', weight='A', config='russian') + SearchVector('description', weight='B', config='russian')
+    last_id = 0
+    while True:
+        batch = products.filter(id__gt=last_id)
+        bound = list(batch.values_list('id', flat=True)[BACKFILL_BATCH_SIZE - 1:BACKFILL_BATCH_SIZE])
+        if bound:
+            batch = batch.filter(id__lte=bound[0])
+        batch.filter(search_vector__isnull=True).update(search_vector=vector)
+        if not bound:
+            return
+        last_id = bound[0]
+
+
+def create_search_index(apps, schema_editor):
+    # CONCURRENTLY: индекс строится без блокировки записи в таблицу товаров.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS product_search_vector_idx ON api_store_product USING gin (search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS product_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api_store', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.2 on 2026-10-17 01:03
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model('api_store', 'Product')
+    ProductReview = apps.get_model('api_store', 'ProductReview')
+    reviews = ProductReview.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    Product.objects.using(schema_editor.connection.alias).update(
+        reviews_count=Coalesce(
+            Subquery(reviews.annotate(count=Count('id')).values('count'), output_field=IntegerField()),
+            Value(0),
+        ),
+        rating_avg=Subquery(reviews.annotate(avg=Avg('rating')).values('avg')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_store', '0003_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=3, null=True, verbose_name='Средняя оценка'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество отзывов'),
+        ),
+        migrations.RunPython(fill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2 on 2026-10-17 01:11
+
+from django.db import migrations, models
+from api_store.db import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся CONCURRENTLY, вне транзакции.
+    atomic = False
+
+    dependencies = [
+        ('api_store', '0004_product_rating_aggregates'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['user', '-updated_at', '-created_at', '-id'], name='order_user_keyset_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['status', '-updated_at', '-created_at'], name='order_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(condition=models.Q(status__in=['NEW', 'IN_PROGRESS']), fields=['-updated_at', '-created_at'], name='order_open_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['total_amount'], name='order_total_amount_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='order_created_at_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['price'], name='product_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='productreview',
+            index=models.Index(fields=['product', 'created_at'], name='review_product_created_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 3.2 on 2026-10-17 01:33
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def fill_position_prices(apps, schema_editor):
+    """
+    Заполнение цен существующих позиций текущими ценами товаров.
+
+    Миграция неатомарная: каждый пакет id - отдельный UPDATE в своей транзакции,
+    поэтому на большой таблице блокируются только строки пакета, а прерванная
+    миграция при повторном запуске продолжает с незаполненных позиций.
+    """
+    Position = apps.get_model('api_store', 'Position')
+    Product = apps.get_model('api_store', 'Product')
+    positions = Position.objects.using(schema_editor.connection.alias).order_by('id')
+    price = Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price')[:1])
+    last_id = 0
+    while True:
+        batch = positions.filter(id__gt=last_id)
+        bound = list(batch.values_list('id', flat=True)[BACKFILL_BATCH_SIZE - 1:BACKFILL_BATCH_SIZE])
+        if bound:
+            batch = batch.filter(id__lte=bound[0])
+        batch.filter(unit_price__isnull=True).update(
+            unit_price=price,
+            total_price=ExpressionWrapper(F('quantity') * price, output_field=DecimalField(max_digits=12, decimal_places=2)),
+        )
+        if not bound:
+            return
+        last_id = bound[0]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api_store', '0005_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='position',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=12, null=True, verbose_name='Стоимость позиции'),
+        ),
+        migrations.AddField(
+            model_name='position',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Цена за единицу'),
+        ),
+        migrations.RunPython(fill_position_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.2 on 2026-10-17 01:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_store', '0006_position_prices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrderStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('status', models.TextField(choices=[('NEW', 'Открыт'), ('IN_PROGRESS', 'Выполняется'), ('DONE', 'Выполнен')], verbose_name='Статус заказа')),
+                ('orders_count', models.IntegerField(default=0, verbose_name='Количество заказов')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Сумма заказов')),
+            ],
+            options={
+                'verbose_name': 'Заказы за день',
+                'verbose_name_plural': 'Заказы по дням',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('units', models.BigIntegerField(default=0, verbose_name='Продано единиц')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выручка')),
+                ('orders_count', models.IntegerField(default=0, verbose_name='Количество заказов')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='api_store.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Продажи товара за день',
+                'verbose_name_plural': 'Продажи товаров по дням',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyorderstats',
+            constraint=models.UniqueConstraint(fields=('day', 'status'), name='daily_order_stats_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyproductsales',
+            constraint=models.UniqueConstraint(fields=('day', 'product'), name='daily_product_sales_uniq'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2 on 2026-10-17 02:04
+
+from django.db import migrations, models
+from django.db.models import IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def fill_rating_sum(apps, schema_editor):
+    """
+    Заполнение суммы оценок существующих товаров пакетами по id, каждый пакет -
+    отдельный UPDATE в своей транзакции.
+    """
+    Product = apps.get_model('api_store', 'Product')
+    ProductReview = apps.get_model('api_store', 'ProductReview')
+    products = Product.objects.using(schema_editor.connection.alias).order_by('id')
+    reviews = ProductReview.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    rating_sum = Coalesce(
+        Subquery(reviews.annotate(total=Sum('rating')).values('total'), output_field=IntegerField()),
+        Value(0),
+    )
+    last_id = 0
+    while True:
+        batch = products.filter(id__gt=last_id)
+        bound = list(batch.values_list('id', flat=True)[BACKFILL_BATCH_SIZE - 1:BACKFILL_BATCH_SIZE])
+        if bound:
+            batch = batch.filter(id__lte=bound[0])
+        batch.filter(reviews_count__gt=0).update(rating_sum=rating_sum)
+        if not bound:
+            return
+        last_id = bound[0]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api_store', '0007_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(fill_rating_sum, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.conf.global_settings import AUTH_USER_MODEL
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 
@@ -12,6 +13,14 @@ class OrderStatusChoices(models.TextChoices):
     DONE = "DONE", "Выполнен"
 
 
+# Допустимые переходы статуса при массовой смене: статус -> статусы, в которые его можно перевести.
+ORDER_STATUS_TRANSITIONS = {
+    OrderStatusChoices.NEW: (OrderStatusChoices.IN_PROGRESS, OrderStatusChoices.DONE),
+    OrderStatusChoices.IN_PROGRESS: (OrderStatusChoices.DONE,),
+    OrderStatusChoices.DONE: (),
+}
+
+
 class TimestampFields(models.Model):
     """
     Модель абстрактного базового класса, обеспечивающая самообновление полей created_at и updated_at.
@@ -45,6 +54,28 @@ class Product(TimestampFields):
         decimal_places=2,
         verbose_name='Цена',
     )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
+    rating_avg = models.DecimalField(
+        max_digits=3,
+        decimal_places=2,
+        null=True,
+        editable=False,
+        verbose_name='Средняя оценка'
+    )
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество отзывов'
+    )
+    rating_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Сумма оценок'
+    )
 
     def __str__(self):
         return f"{self.name} - Цена {self.price}"
@@ -53,6 +84,10 @@ class Product(TimestampFields):
         verbose_name = 'Товар'
         verbose_name_plural = 'Товары'
         ordering = ['-updated_at', '-created_at']
+        indexes = [
+            models.Index(fields=['-updated_at', '-created_at', '-id'], name='product_keyset_idx'),
+            models.Index(fields=['price'], name='product_price_idx'),
+        ]
 
 
 class Position(models.Model):
@@ -75,6 +110,43 @@ class Position(models.Model):
         default=1,
         verbose_name='Количество'
     )
+    unit_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        editable=False,
+        verbose_name='Цена за единицу'
+    )
+    total_price = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        editable=False,
+        verbose_name='Стоимость позиции'
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # При замене товара в позиции цена берётся заново.
+        instance._loaded_product_id = instance.__dict__.get('product_id')
+        return instance
+
+    def fill_prices(self):
+        """
+        Снимок цены товара на момент заказа и стоимость позиции.
+        """
+        if self.unit_price is None:
+            self.unit_price = self.product.price
+        self.total_price = self.unit_price * self.quantity
+        return self
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and self.product_id != getattr(self, '_loaded_product_id', self.product_id):
+            self.unit_price = None
+        self.fill_prices()
+        super().save(*args, **kwargs)
+        self._loaded_product_id = self.product_id
 
     def __str__(self):
         return f"Заказ ID_{self.order.id} | Товар - {self.product} | Количество - {self.quantity} "
@@ -91,6 +163,8 @@ class Order(TimestampFields):
     user = models.ForeignKey(
         AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        # Поиск по user_id покрывает order_user_keyset_idx.
+        db_index=False,
         verbose_name='Пользователь'
     )
     status = models.TextField(
@@ -118,6 +192,18 @@ class Order(TimestampFields):
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
         ordering = ['-updated_at', '-created_at']
+        indexes = [
+            models.Index(fields=['-updated_at', '-created_at', '-id'], name='order_keyset_idx'),
+            models.Index(fields=['user', '-updated_at', '-created_at', '-id'], name='order_user_keyset_idx'),
+            models.Index(fields=['status', '-updated_at', '-created_at'], name='order_status_idx'),
+            models.Index(
+                fields=['-updated_at', '-created_at'],
+                condition=models.Q(status__in=[OrderStatusChoices.NEW, OrderStatusChoices.IN_PROGRESS]),
+                name='order_open_idx',
+            ),
+            models.Index(fields=['total_amount'], name='order_total_amount_idx'),
+            models.Index(fields=['created_at'], name='order_created_at_idx'),
+        ]
 
 
 class ProductReview(TimestampFields):
@@ -133,7 +219,9 @@ class ProductReview(TimestampFields):
         Product,
         related_name='reviews',
         verbose_name='Товар',
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        # Поиск по product_id покрывает review_product_created_idx.
+        db_index=False,
     )
     text = models.TextField(
         verbose_name='Текст отзыва'
@@ -143,6 +231,19 @@ class ProductReview(TimestampFields):
         verbose_name='Оценка'
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Товар и оценка на момент загрузки: из них считается приращение агрегатов товара.
+        instance._loaded_product_id = instance.__dict__.get('product_id')
+        instance._loaded_rating = instance.__dict__.get('rating')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_product_id = self.product_id
+        self._loaded_rating = self.rating
+
     def __str__(self):
         return f"ID_{self.id} | {self.product} - {self.user}"
 
@@ -151,6 +252,10 @@ class ProductReview(TimestampFields):
         verbose_name_plural = 'Отзывы'
         unique_together = ["user", "product"]
         ordering = ['-updated_at', '-created_at']
+        indexes = [
+            models.Index(fields=['-updated_at', '-created_at', '-id'], name='review_keyset_idx'),
+            models.Index(fields=['product', 'created_at'], name='review_product_created_idx'),
+        ]
 
 
 class ProductCollection(TimestampFields):
@@ -177,3 +282,78 @@ class ProductCollection(TimestampFields):
         verbose_name = 'Подборка товаров'
         verbose_name_plural = 'Подборки товаров'
         ordering = ['-updated_at', '-created_at']
+        indexes = [
+            models.Index(fields=['-updated_at', '-created_at', '-id'], name='collection_keyset_idx'),
+        ]
+
+
+class DailyProductSales(models.Model):
+    """
+    Витрина продаж: товар за день (по дате создания заказа).
+    """
+    day = models.DateField(
+        verbose_name='День'
+    )
+    product = models.ForeignKey(
+        Product,
+        related_name='daily_sales',
+        on_delete=models.CASCADE,
+        verbose_name='Товар'
+    )
+    units = models.BigIntegerField(
+        default=0,
+        verbose_name='Продано единиц'
+    )
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Выручка'
+    )
+    orders_count = models.IntegerField(
+        default=0,
+        verbose_name='Количество заказов'
+    )
+
+    def __str__(self):
+        return f'{self.day} | Товар ID_{self.product_id} | {self.units} шт. на {self.revenue}'
+
+    class Meta:
+        verbose_name = 'Продажи товара за день'
+        verbose_name_plural = 'Продажи товаров по дням'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='daily_product_sales_uniq'),
+        ]
+
+
+class DailyOrderStats(models.Model):
+    """
+    Витрина заказов: статус за день (по дате создания заказа).
+    """
+    day = models.DateField(
+        verbose_name='День'
+    )
+    status = models.TextField(
+        choices=OrderStatusChoices.choices,
+        verbose_name='Статус заказа'
+    )
+    orders_count = models.IntegerField(
+        default=0,
+        verbose_name='Количество заказов'
+    )
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Сумма заказов'
+    )
+
+    def __str__(self):
+        return f'{self.day} | {self.status} | {self.orders_count} заказов на {self.revenue}'
+
+    class Meta:
+        verbose_name = 'Заказы за день'
+        verbose_name_plural = 'Заказы по дням'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='daily_order_stats_uniq'),
+        ]
@@ -0,0 +1,199 @@
+import base64
+import datetime
+import json
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+APPROXIMATE_COUNT_THRESHOLD = 100000
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset-пагинация по порядку queryset (по умолчанию (updated_at, created_at, id)
+    в порядке убывания); к сортировке из ?ordering добавляется id для однозначности.
+
+    Включается только по запросу: если в query params нет ни cursor, ни page_size,
+    список отдаётся целиком, как и раньше. Следующая страница выбирается условием
+    WHERE по ключу последней записи, поэтому глубокие страницы стоят столько же,
+    сколько первая (без OFFSET). Курсор хранит поля сортировки и их значения.
+    """
+    ordering = ('-updated_at', '-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE or 100
+    max_page_size = 1000
+    invalid_cursor_message = 'Некорректный курсор'
+
+    def is_enabled(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """
+        Поля сортировки queryset: [(имя, по убыванию, поле модели или None)].
+        """
+        ordering = [item for item in queryset.query.order_by if isinstance(item, str)]
+        if len(ordering) != len(queryset.query.order_by) or not ordering:
+            ordering = list(self.ordering)
+        names = {item.lstrip('-') for item in ordering}
+        if not names & {'id', 'pk'}:
+            ordering.append('-id')
+        result = []
+        for item in ordering:
+            name = item.lstrip('-')
+            result.append((name, item.startswith('-'), self.get_model_field(queryset, name)))
+        return result
+
+    def get_model_field(self, queryset, name):
+        """
+        Поле модели или выходное поле аннотации (например, search_rank поиска).
+        """
+        if name == 'pk':
+            return queryset.model._meta.pk
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        try:
+            return queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise ValidationError({'ordering': f'Сортировка по {name} не поддерживается постраничным выводом'})
+
+    def order_queryset(self, queryset):
+        # NULL всегда в конце, чтобы условие по курсору не зависело от СУБД.
+        return queryset.order_by(*(
+            getattr(F(name), 'desc' if descending else 'asc')(nulls_last=True) if field.null
+            else f"{'-' if descending else ''}{name}"
+            for name, descending, field in self.keyset
+        ))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_enabled(request):
+            return None
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        self.keyset = self.get_ordering(queryset)
+        queryset = self.order_queryset(queryset)
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            queryset = queryset.filter(self.get_keyset_filter(self.decode_cursor(encoded)))
+
+        # Одна лишняя запись показывает, есть ли следующая страница.
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_keyset_filter(self, position):
+        """
+        Развёрнутое сравнение кортежей: запись после курсора, если по первому отличающемуся
+        полю сортировки она дальше в порядке выдачи. NULL идут после всех значений.
+        """
+        condition = Q()
+        equal = Q()
+        for (name, descending, field), value in zip(self.keyset, position):
+            if value is None:
+                equal &= Q(**{f'{name}__isnull': True})
+                continue
+            after = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+            if field.null:
+                after |= Q(**{f'{name}__isnull': True})
+            condition |= equal & after
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, instance):
+        position = []
+        for name, _, field in self.keyset:
+            value = getattr(instance, field.attname if getattr(field, 'model', None) else name)
+            if isinstance(value, (datetime.datetime, Decimal)):
+                value = value.isoformat() if isinstance(value, datetime.datetime) else str(value)
+            position.append([name, value])
+        encoded = base64.urlsafe_b64encode(json.dumps(position).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, encoded):
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if [name for name, _ in position] != [name for name, _, _ in self.keyset]:
+                raise ValueError
+            return [
+                None if value is None else field.to_python(value)
+                for (_, value), (_, _, field) in zip(position, self.keyset)
+            ]
+        except (TypeError, ValueError, UnicodeEncodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.last)
+
+    def get_first_link(self):
+        return remove_query_param(self.base_url, self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('first', self.get_first_link()),
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'first': {'type': 'string', 'nullable': False},
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Paginator админки для больших таблиц: на PostgreSQL число строк берётся из оценки
+    планировщика (EXPLAIN), если она больше APPROXIMATE_COUNT_THRESHOLD; точный COUNT(*)
+    выполняется только для небольших выборок и на остальных СУБД.
+    """
+    threshold = APPROXIMATE_COUNT_THRESHOLD
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and connections[queryset.db].vendor == 'postgresql':
+            estimate = estimate_count(queryset)
+            if estimate >= self.threshold:
+                return estimate
+        return super().count
+
+
+def estimate_count(queryset):
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
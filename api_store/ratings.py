@@ -0,0 +1,70 @@
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from api_store.models import Product, ProductReview
+
+REBUILD_BATCH_SIZE = 10000
+
+
+def rating_avg_expression(rating_sum, reviews_count):
+    """
+    Средняя оценка из суммы и числа оценок; NULL для товара без отзывов.
+    """
+    return Cast(rating_sum, FloatField()) / NullIf(reviews_count, Value(0))
+
+
+def refresh_product_ratings(queryset):
+    """
+    Пересчёт rating_sum, reviews_count и rating_avg для товаров из queryset одним UPDATE.
+    Агрегаты считаются коррелированными подзапросами по индексу product_id отзывов.
+    """
+    reviews = (
+        ProductReview.objects
+        .filter(product=OuterRef('pk'))
+        .order_by()
+        .values('product')
+    )
+    rating_sum = Coalesce(
+        Subquery(reviews.annotate(total=Sum('rating')).values('total'), output_field=IntegerField()),
+        Value(0),
+    )
+    reviews_count = Coalesce(
+        Subquery(reviews.annotate(count=Count('id')).values('count'), output_field=IntegerField()),
+        Value(0),
+    )
+    return queryset.update(
+        rating_sum=rating_sum,
+        reviews_count=reviews_count,
+        rating_avg=rating_avg_expression(rating_sum, reviews_count),
+    )
+
+
+def apply_rating_delta(product_id, rating_delta, count_delta, using=None):
+    """
+    Приращение агрегатов товара одним UPDATE без чтения его отзывов.
+
+    UPDATE блокирует строку товара до конца транзакции отзыва, а F-выражения берут
+    последнюю зафиксированную версию строки, поэтому параллельные отзывы на один товар
+    не затирают приращения друг друга. В SET все столбцы справа - значения до UPDATE.
+    """
+    rating_sum = F('rating_sum') + rating_delta
+    reviews_count = F('reviews_count') + count_delta
+    Product.objects.using(using).filter(pk=product_id).update(
+        rating_sum=rating_sum,
+        reviews_count=reviews_count,
+        rating_avg=rating_avg_expression(rating_sum, reviews_count),
+    )
+
+
+def rebuild_product_ratings(batch_size=REBUILD_BATCH_SIZE, using=None):
+    """
+    Полная перестройка агрегатов по всем товарам пакетами по диапазонам id.
+    """
+    products = Product.objects.using(using).order_by('id')
+    updated = 0
+    last_id = 0
+    while True:
+        ids = list(products.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return updated
+        updated += refresh_product_ratings(products.filter(id__gte=ids[0], id__lte=ids[-1]))
+        last_id = ids[-1]
@@ -0,0 +1,107 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_STICKY_KEY_PREFIX = 'api_store:db:sticky:'
+
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def get_sticky_key(user):
+    return f'{REPLICA_STICKY_KEY_PREFIX}{user.pk}'
+
+
+def mark_primary_sticky(user):
+    """
+    После записи пользователь какое-то время читает с основной базы (read-your-writes).
+    """
+    if user.is_authenticated:
+        cache.set(get_sticky_key(user), True, getattr(settings, 'REPLICA_STICKY_SECONDS', 10))
+
+
+def is_primary_sticky(user):
+    return user.is_authenticated and cache.get(get_sticky_key(user)) is not None
+
+
+def iter_replica_reads(content):
+    """
+    Чтение с реплик на время получения каждого фрагмента потокового ответа: тело
+    (выгрузки NDJSON/CSV) читается из базы уже после выхода из view.
+    """
+    iterator = iter(content)
+    while True:
+        token = replica_reads.set(True)
+        try:
+            chunk = next(iterator, None)
+        finally:
+            replica_reads.reset(token)
+        if chunk is None:
+            return
+        yield chunk
+
+
+class ReplicaRouter:
+    """
+    Роутер: чтение внутри запросов, помеченных replica_reads, уходит на случайную
+    реплику из DATABASE_REPLICAS, всё остальное - на default.
+    """
+
+    def choose_replica(self, replicas):
+        return random.choice(replicas)
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads.get():
+            return None
+        replicas = get_replicas()
+        if not replicas:
+            return None
+        return self.choose_replica(replicas)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему репликацией с основной базы.
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaRoutingMixin:
+    """
+    Безопасные запросы view читают с реплик, если пользователь недавно ничего не
+    записывал. Успешные изменяющие запросы закрепляют пользователя за основной базой
+    на REPLICA_STICKY_SECONDS.
+    """
+    replica_reads = True
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.replica_reads and request.method in SAFE_METHODS and not is_primary_sticky(request.user):
+            self.replica_reads_token = replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            mark_primary_sticky(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def dispatch(self, request, *args, **kwargs):
+        self.replica_reads_token = None
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        finally:
+            if self.replica_reads_token is not None:
+                replica_reads.reset(self.replica_reads_token)
+        if self.replica_reads_token is not None and response.streaming:
+            response.streaming_content = iter_replica_reads(response.streaming_content)
+        return response
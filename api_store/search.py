@@ -0,0 +1,78 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import Case, F, FloatField, IntegerField, Q, Value, When
+from django.db.models.functions import Cast
+
+SEARCH_CONFIG = 'russian'
+SEARCH_TERM_RE = re.compile(r'\w+')
+
+
+def is_postgresql(using):
+    return connections[using].vendor == 'postgresql'
+
+
+def product_search_vector():
+    """
+    Выражение поискового вектора товара: название весомее описания.
+    """
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def update_product_search_vector(queryset):
+    """
+    Пересчёт search_vector для товаров из queryset одним UPDATE.
+    """
+    if is_postgresql(queryset.db):
+        queryset.update(search_vector=product_search_vector())
+
+
+def get_search_terms(query):
+    return SEARCH_TERM_RE.findall(query.lower())
+
+
+def search_products(queryset, query):
+    """
+    Полнотекстовый поиск товаров с ранжированием.
+
+    На PostgreSQL используется search_vector и GIN-индекс: каждое слово запроса
+    приводится к основе словарём russian и ищется по префиксу. На остальных СУБД
+    (SQLite в тестах) слова ищутся через icontains, совпадения в названии выше.
+    """
+    terms = get_search_terms(query)
+    if not terms:
+        return queryset.none()
+
+    if is_postgresql(queryset.db):
+        search_query = SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms),
+            search_type='raw',
+            config=SEARCH_CONFIG,
+        )
+        return (
+            queryset
+            .filter(search_vector=search_query)
+            # float8 вместо real: значение ранга точно возвращается из курсора keyset-пагинации.
+            .annotate(search_rank=Cast(SearchRank(F('search_vector'), search_query), FloatField()))
+            .order_by('-search_rank', '-updated_at', '-created_at', '-id')
+        )
+
+    condition = Q()
+    name_matches = Q()
+    for term in terms:
+        condition &= Q(name__icontains=term) | Q(description__icontains=term)
+        name_matches &= Q(name__icontains=term)
+    return (
+        queryset
+        .filter(condition)
+        .annotate(search_rank=Case(
+            When(name_matches, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+        .order_by('-search_rank', '-updated_at', '-created_at', '-id')
+    )
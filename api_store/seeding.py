@@ -0,0 +1,295 @@
+"""
+Генерация больших объёмов синтетических данных магазина для нагрузочных замеров.
+"""
+import datetime
+import decimal
+import random
+import time
+from array import array
+from bisect import bisect
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db.models import Max
+from api_store.analytics import rebuild_sales_rollups
+from api_store.bulk import iter_batches
+from api_store.models import Order, OrderStatusChoices, Position, Product, ProductCollection, ProductReview
+from api_store.ratings import rebuild_product_ratings
+from api_store.search import is_postgresql, update_product_search_vector
+
+SEED_BATCH_SIZE = 5000
+# Конец периода дат по умолчанию: от него, а не от текущего времени, данные при одном seed совпадают.
+SEED_NOW = datetime.datetime(2021, 6, 1, tzinfo=datetime.timezone.utc)
+
+ADJECTIVES = (
+    'Классический', 'Компактный', 'Надёжный', 'Лёгкий', 'Прочный', 'Универсальный', 'Садовый',
+    'Детский', 'Кухонный', 'Дорожный', 'Беспроводной', 'Складной', 'Тёплый', 'Новый',
+)
+NOUNS = (
+    'рюкзак', 'чайник', 'фонарь', 'стул', 'светильник', 'термос', 'зонт', 'плед', 'набор посуды',
+    'велосипед', 'коврик', 'пылесос', 'утюг', 'конструктор', 'шкаф', 'самокат',
+)
+WORDS = (
+    'удобный', 'качественный', 'материал', 'подходит', 'для', 'дома', 'и', 'дачи', 'в', 'комплекте',
+    'гарантия', 'производитель', 'размер', 'цвет', 'сталь', 'пластик', 'дерево', 'ткань', 'вес',
+    'отлично', 'служит', 'долго', 'легко', 'моется', 'хранится', 'подарок', 'семьи', 'каждый', 'день',
+    'модель', 'года', 'с', 'защитой', 'от', 'влаги', 'ударов', 'инструкция', 'на', 'русском', 'языке',
+)
+REVIEW_TEXTS = {
+    1: 'Не рекомендую, сломался через неделю.',
+    2: 'Качество хуже, чем ожидал.',
+    3: 'Нормально за свои деньги.',
+    4: 'Хороший товар, есть мелкие недочёты.',
+    5: 'Отличный товар, всем советую!',
+}
+# J-образное распределение оценок: большинство ставит 5, недовольные - 1.
+RATING_WEIGHTS = (10, 5, 8, 22, 55)
+STATUS_WEIGHTS = {
+    OrderStatusChoices.NEW: 15,
+    OrderStatusChoices.IN_PROGRESS: 10,
+    OrderStatusChoices.DONE: 75,
+}
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Временное отключение auto_now/auto_now_add, чтобы bulk_create сохранил заданные даты.
+    """
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class ZipfSampler:
+    """
+    Выбор индекса из range(size) с вероятностью ~ 1 / rank ** exponent.
+    Ранги случайно перемешаны, чтобы популярность не совпадала с порядком id.
+    """
+
+    def __init__(self, size, exponent, rnd):
+        self.rnd = rnd
+        self.cum_weights = array('d')
+        total = 0
+        for rank in range(1, size + 1):
+            total += rank ** -exponent
+            self.cum_weights.append(total)
+        self.total = total
+        self.permutation = array('q', range(size))
+        rnd.shuffle(self.permutation)
+
+    def sample(self):
+        index = bisect(self.cum_weights, self.rnd.random() * self.total)
+        return self.permutation[min(index, len(self.permutation) - 1)]
+
+    def sample_distinct(self, count):
+        count = min(count, len(self.permutation))
+        result = []
+        while len(result) < count:
+            index = self.sample()
+            if index not in result:
+                result.append(index)
+        return result
+
+
+class StoreSeeder:
+    """
+    Детерминированный (при одном seed) генератор пользователей, товаров, заказов,
+    отзывов и подборок.
+
+    Строки вставляются пачками bulk_create; id новых строк читаются после каждой
+    пачки, в памяти хранятся только компактные массивы id и цен.
+    """
+
+    def __init__(self, seed=0, batch_size=SEED_BATCH_SIZE, days=365, zipf_exponent=1.1, now=SEED_NOW, using='default'):
+        self.rnd = random.Random(seed)
+        self.seed = seed
+        self.batch_size = batch_size
+        self.using = using
+        self.zipf_exponent = zipf_exponent
+        self.now = now
+        self.period = datetime.timedelta(days=days).total_seconds()
+        self.user_ids = array('q')
+        self.product_ids = array('q')
+        self.product_prices = array('q')
+        self.stats = []
+
+    def random_datetime(self):
+        return self.now - datetime.timedelta(seconds=self.rnd.random() * self.period)
+
+    def random_text(self, min_words, max_words):
+        words = [self.rnd.choice(WORDS) for _ in range(self.rnd.randint(min_words, max_words))]
+        return ' '.join(words).capitalize() + '.'
+
+    def insert(self, model, objects):
+        """
+        Вставка пачки и id созданных строк в порядке вставки.
+        """
+        manager = model.objects.using(self.using)
+        last_id = manager.aggregate(last_id=Max('id'))['last_id'] or 0
+        manager.bulk_create(objects)
+        return manager.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)
+
+    @contextmanager
+    def measure(self, name):
+        started = time.perf_counter()
+        counter = {'rows': 0}
+        yield counter
+        elapsed = time.perf_counter() - started
+        self.stats.append({
+            'name': name,
+            'rows': counter['rows'],
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(counter['rows'] / elapsed) if elapsed else None,
+        })
+
+    def seed_users(self, count):
+        prefix = f'seed_{self.seed}_'
+        with self.measure('users') as counter:
+            for batch in iter_batches(range(count), self.batch_size):
+                users = [
+                    User(username=f'{prefix}{number}', password='!', email=f'{prefix}{number}@example.com',
+                         date_joined=self.random_datetime())
+                    for number in batch
+                ]
+                self.user_ids.extend(self.insert(User, users))
+                counter['rows'] += len(users)
+
+    def seed_products(self, count):
+        with self.measure('products') as counter, explicit_timestamps(Product):
+            for batch in iter_batches(range(count), self.batch_size):
+                products = []
+                prices = []
+                for number in batch:
+                    # Цены логнормальные: много дешёвых товаров, длинный хвост дорогих.
+                    price = min(int(self.rnd.lognormvariate(7.5, 1.2) * 100), 9999999999)
+                    created_at = self.random_datetime()
+                    products.append(Product(
+                        name=f'{self.rnd.choice(ADJECTIVES)} {self.rnd.choice(NOUNS)} {number + 1}',
+                        description=self.random_text(10, 60),
+                        price=decimal.Decimal(price) / 100,
+                        created_at=created_at,
+                        updated_at=created_at,
+                    ))
+                    prices.append(price)
+                self.product_ids.extend(self.insert(Product, products))
+                self.product_prices.extend(prices)
+                counter['rows'] += len(products)
+        self.product_sampler = ZipfSampler(len(self.product_ids), self.zipf_exponent, self.rnd)
+        # Число заказов на пользователя тоже распределено по Ципфу.
+        self.user_sampler = ZipfSampler(len(self.user_ids), 0.8, self.rnd)
+
+    def seed_orders(self, count, max_positions=5):
+        statuses = list(STATUS_WEIGHTS)
+        status_weights = list(STATUS_WEIGHTS.values())
+        with self.measure('orders') as counter, self.measure('positions') as positions_counter, \
+                explicit_timestamps(Order):
+            for batch in iter_batches(range(count), self.batch_size):
+                orders = []
+                planned = []
+                for _ in batch:
+                    items = [
+                        (index, self.rnd.choices((1, 2, 3, 4, 5), (60, 20, 10, 6, 4))[0])
+                        for index in self.product_sampler.sample_distinct(self.rnd.randint(1, max_positions))
+                    ]
+                    total = sum(self.product_prices[index] * quantity for index, quantity in items)
+                    created_at = self.random_datetime()
+                    orders.append(Order(
+                        user_id=self.user_ids[self.user_sampler.sample()],
+                        status=self.rnd.choices(statuses, status_weights)[0],
+                        total_amount=decimal.Decimal(min(total, 9999999999)) / 100,
+                        created_at=created_at,
+                        updated_at=created_at,
+                    ))
+                    planned.append(items)
+                positions = [
+                    Position(
+                        order_id=order_id,
+                        product_id=self.product_ids[index],
+                        quantity=quantity,
+                        unit_price=decimal.Decimal(self.product_prices[index]) / 100,
+                        total_price=decimal.Decimal(self.product_prices[index] * quantity) / 100,
+                    )
+                    for order_id, items in zip(self.insert(Order, orders), planned)
+                    for index, quantity in items
+                ]
+                Position.objects.using(self.using).bulk_create(positions, batch_size=self.batch_size)
+                counter['rows'] += len(orders)
+                positions_counter['rows'] += len(positions)
+
+    def seed_reviews(self, count):
+        """
+        Отзывы чаще пишут на популярные товары. Повторная пара (user, product)
+        пропускается ограничением уникальности, поэтому строк может быть чуть меньше count.
+        """
+        manager = ProductReview.objects.using(self.using)
+        with self.measure('reviews') as counter, explicit_timestamps(ProductReview):
+            before = manager.count()
+            for batch in iter_batches(range(count), self.batch_size):
+                reviews = []
+                for _ in batch:
+                    rating = self.rnd.choices((1, 2, 3, 4, 5), RATING_WEIGHTS)[0]
+                    created_at = self.random_datetime()
+                    reviews.append(ProductReview(
+                        user_id=self.user_ids[self.rnd.randrange(len(self.user_ids))],
+                        product_id=self.product_ids[self.product_sampler.sample()],
+                        text=REVIEW_TEXTS[rating],
+                        rating=rating,
+                        created_at=created_at,
+                        updated_at=created_at,
+                    ))
+                manager.bulk_create(reviews, ignore_conflicts=True)
+            counter['rows'] = manager.count() - before
+
+    def seed_collections(self, count, min_products=5, max_products=30):
+        through = ProductCollection.products.through
+        with self.measure('collections') as counter, explicit_timestamps(ProductCollection):
+            for batch in iter_batches(range(count), self.batch_size):
+                collections = []
+                for number in batch:
+                    created_at = self.random_datetime()
+                    collections.append(ProductCollection(
+                        title=f'Подборка {number + 1}: {self.rnd.choice(NOUNS)}',
+                        text=self.random_text(5, 20),
+                        created_at=created_at,
+                        updated_at=created_at,
+                    ))
+                links = [
+                    through(productcollection_id=collection_id, product_id=self.product_ids[index])
+                    for collection_id in self.insert(ProductCollection, collections)
+                    for index in self.product_sampler.sample_distinct(self.rnd.randint(min_products, max_products))
+                ]
+                through.objects.using(self.using).bulk_create(links, batch_size=self.batch_size)
+                counter['rows'] += len(collections)
+
+    def refresh_denormalized(self):
+        """
+        bulk_create не вызывает сигналы: агрегаты отзывов, витрины продаж и поисковый вектор
+        пересчитываются в конце.
+        """
+        with self.measure('ratings') as counter:
+            counter['rows'] = rebuild_product_ratings(batch_size=self.batch_size * 2, using=self.using)
+        with self.measure('sales_rollups') as counter:
+            counter['rows'] = rebuild_sales_rollups(using=self.using)
+        if is_postgresql(self.using) and self.product_ids:
+            with self.measure('search_vector') as counter:
+                update_product_search_vector(Product.objects.using(self.using).filter(id__gte=self.product_ids[0]))
+                counter['rows'] = len(self.product_ids)
+
+    def run(self, users, products, orders, reviews, collections):
+        self.seed_users(users)
+        self.seed_products(products)
+        self.seed_orders(orders)
+        self.seed_reviews(reviews)
+        self.seed_collections(collections)
+        self.refresh_denormalized()
+        return self.stats
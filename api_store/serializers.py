@@ -1,7 +1,12 @@
 from django.contrib.auth.models import User
+from django.db import IntegrityError, connections, router, transaction
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from api_store.models import Product, Position, ProductCollection, ProductReview, Order
+from api_store.models import ORDER_STATUS_TRANSITIONS, Order, OrderStatusChoices, Position, Product, \
+    ProductCollection, ProductReview
+from api_store.analytics import record_sales, track_sales
+from api_store.totals import refresh_order_total
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -21,7 +26,8 @@ class ProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        fields = ('id', 'name', 'description', 'price')
+        fields = ('id', 'name', 'description', 'price', 'rating_avg', 'reviews_count')
+        read_only_fields = ('rating_avg', 'reviews_count')
 
 
 class ProductReviewSerializer(serializers.ModelSerializer):
@@ -34,48 +40,95 @@ class ProductReviewSerializer(serializers.ModelSerializer):
     user = UserSerializer(
         read_only=True,
     )
+    product_id = serializers.IntegerField(
+        write_only=True,
+        min_value=1,
+        required=False,
+    )
 
     class Meta:
         model = ProductReview
-        fields = ('id', 'user', 'product', 'text', 'rating', 'created_at', 'updated_at')
+        fields = ('id', 'user', 'product', 'product_id', 'text', 'rating', 'created_at', 'updated_at')
 
     def validate(self, data):
         """
-        Метод для валидации отзывов. Вызывается при создании и обновлении.
+        Метод для валидации отзывов. Существование товара и повторный отзыв
+        проверяются ограничениями базы при сохранении.
         """
-        product_id = self.context['request'].data['product_id']
-        if not Product.objects.filter(id=product_id):
-            raise serializers.ValidationError('Товара с таким ID не существует')
+        if self.instance is None and 'product_id' not in data:
+            raise serializers.ValidationError({'product_id': 'Обязательное поле.'})
         return data
 
+    def insert(self, validated_data):
+        """
+        Создание отзыва одним INSERT. None, если отзыв пользователя на товар уже есть.
+
+        Уникальность (user, product) проверяется сразу, внешний ключ на товар в PostgreSQL
+        отложен до COMMIT, поэтому он проверяется check_constraints внутри точки сохранения.
+        """
+        using = router.db_for_write(ProductReview)
+        with transaction.atomic(using=using):
+            try:
+                review = ProductReview.objects.create(**validated_data)
+            except IntegrityError:
+                # Выход из блока откатит точку сохранения.
+                return None
+            try:
+                connections[using].check_constraints(table_names=[ProductReview._meta.db_table])
+            except IntegrityError:
+                # Прежняя форма ответа: раньше товар проверялся в validate().
+                raise serializers.ValidationError({'non_field_errors': ['Товара с таким ID не существует']})
+        return review
+
     def create(self, validated_data):
         """
         Переопределение метода Create при создании отзывов.
         """
-        user = self.context["request"].user
-        product_id = self.context['request'].data['product_id']
-        reviews_count = ProductReview.objects.filter(user=user.id).filter(product=product_id).count()
-        if reviews_count >= 1:
+        validated_data['user'] = self.context['request'].user
+        review = self.insert(validated_data)
+        if review is None:
             raise ValidationError("Пользователь уже оставил отзыв на этот товар")
-        else:
-            validated_data['user'] = user
-            validated_data['product'] = Product.objects.get(id=product_id)
-        return super().create(validated_data)
+        return review
+
+    def update(self, instance, validated_data):
+        # Отзыв не переносится на другой товар.
+        validated_data.pop('product_id', None)
+        return super().update(instance, validated_data)
+
+    def upsert(self):
+        """
+        Создание или обновление отзыва текущего пользователя на товар.
+        Возвращает True, если отзыв создан.
+        """
+        validated_data = {**self.validated_data, 'user': self.context['request'].user}
+        self.instance = self.insert(validated_data)
+        if self.instance is not None:
+            return True
+        with transaction.atomic():
+            self.instance = ProductReview.objects.select_for_update().get(
+                user=validated_data['user'], product_id=validated_data['product_id'],
+            )
+            self.instance.text = validated_data['text']
+            self.instance.rating = validated_data['rating']
+            self.instance.save()
+        return False
 
 
 class PositionSerializer(serializers.ModelSerializer):
     """
     Serializer для позиций товаров в заказе.
     """
-    product = serializers.PrimaryKeyRelatedField(
-        queryset=Product.objects.all(),
+    product = serializers.IntegerField(
+        source='product_id',
+        min_value=1,
         required=True,
     )
     quantity = serializers.IntegerField(min_value=1, default=1)
 
     class Meta:
         model = Position
-        fields = ('id', 'product', 'quantity')
+        fields = ('id', 'product', 'quantity', 'unit_price', 'total_price')
+        read_only_fields = ('unit_price', 'total_price')
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -98,62 +151,111 @@ class OrderSerializer(serializers.ModelSerializer):
         if 'positions' in data:
             product_ids = set()
             for position in data['positions']:
-                product_ids.add(position['product'])
+                product_ids.add(position['product_id'])
             if len(product_ids) != len(data['positions']):
                 raise serializers.ValidationError('Продукты не должны повторяться в заказе')
+            self.resolve_products(data['positions'], product_ids)
         return data
 
+    def resolve_products(self, positions, product_ids):
+        """
+        Получение товаров всех позиций одним запросом id__in.
+        Товары, заранее загруженные в context['products'], повторно не запрашиваются.
+        """
+        products = self.context.get('products', {})
+        not_loaded_ids = product_ids - products.keys()
+        if not_loaded_ids:
+            products.update(Product.objects.only('id', 'price').in_bulk(not_loaded_ids))
+        missing_ids = product_ids - products.keys()
+        if missing_ids:
+            raise serializers.ValidationError(f'Товар с ID {min(missing_ids)} не существует')
+        for position in positions:
+            position['product'] = products[position.pop('product_id')]
+
+    @staticmethod
+    def build_positions(order_id, positions):
+        """
+        Позиции заказа с ценами из уже загруженных товаров, без дополнительных запросов.
+        """
+        return [
+            Position(order_id=order_id, product=position['product'], quantity=position['quantity']).fill_prices()
+            for position in positions
+        ]
+
     def create(self, validated_data):
         """
         Переопределение метода Create при создании заказов.
         """
         validated_data['user'] = self.context['request'].user
         positions = validated_data.pop('positions')
-        validated_data['total_amount'] = 0
-        for product in positions:
-            price = product['product'].price
-            validated_data['total_amount'] += price * product['quantity']
-        order = super().create(validated_data)
-        if positions:
-            to_save = []
-            for products in positions:
-                to_save.append(
-                    Position(
-                        product=products['product'],
-                        quantity=products['quantity'],
-                        order_id=order.id
-                    )
-                )
-            Position.objects.bulk_create(to_save)
-            return order
+        with transaction.atomic():
+            order = super().create(validated_data)
+            if positions:
+                Position.objects.bulk_create(self.build_positions(order.id, positions))
+            refresh_order_total(order.id)
+            order.refresh_from_db(fields=['total_amount', 'updated_at'])
+            record_sales(Order.objects.filter(pk=order.id))
+        return order
 
     def update(self, instance, validated_data):
         validated_data['user'] = instance.user
-        if 'positions' in validated_data:
-            positions = validated_data.pop('positions')
-            instance.positions.all().delete()
-            total = 0
-            for product in positions:
-                price = product['product'].price
-                total += price * product['quantity']
-            instance.total = total
-            if positions:
-                to_save = []
-                for products in positions:
-                    to_save.append(
-                        Position(
-                            product=products['product'],
-                            quantity=products['quantity'],
-                            order_id=instance.id,
-                        )
-                    )
-                Position.objects.bulk_create(to_save)
-        if 'status' in validated_data:
-            instance.status = validated_data.pop('status')
-        instance.save()
+        refresh_total = 'positions' in validated_data
+        with track_sales(Order.objects.filter(pk=instance.pk), products=refresh_total):
+            if refresh_total:
+                positions = validated_data.pop('positions')
+                instance.positions.all().delete()
+                if positions:
+                    Position.objects.bulk_create(self.build_positions(instance.id, positions))
+            if 'status' in validated_data:
+                instance.status = validated_data.pop('status')
+            instance.save()
+            if refresh_total:
+                refresh_order_total(instance.id)
+                instance.refresh_from_db(fields=['total_amount', 'updated_at'])
         return instance
 
 
+class OrderStatusTransitionSerializer(serializers.Serializer):
+    """
+    Serializer для массовой смены статуса заказов.
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+    )
+    status = serializers.ChoiceField(choices=OrderStatusChoices.choices)
+
+    def validate_status(self, value):
+        if not self.get_source_statuses(value):
+            raise serializers.ValidationError(f'Переход в статус {value} не допускается')
+        return value
+
+    @staticmethod
+    def get_source_statuses(status):
+        return [source for source, targets in ORDER_STATUS_TRANSITIONS.items() if status in targets]
+
+    def transition(self, queryset):
+        """
+        Перевод заказов из queryset в новый статус одним UPDATE со сдвигом updated_at.
+        Заказы, для которых переход не допускается, не меняются. Возвращает число изменённых заказов.
+        Витрина заказов по статусам обновляется в той же транзакции.
+        """
+        status = self.validated_data['status']
+        if 'ids' in self.validated_data:
+            queryset = queryset.filter(id__in=self.validated_data['ids'])
+        with transaction.atomic():
+            # Заказы блокируются, чтобы витрины изменились ровно на переведённый набор.
+            order_ids = list(
+                Order.objects
+                .filter(pk__in=queryset.values('pk'), status__in=self.get_source_statuses(status))
+                .select_for_update()
+                .values_list('pk', flat=True)
+            )
+            with track_sales(Order.objects.filter(pk__in=order_ids), products=False) as orders:
+                return orders.update(status=status, updated_at=timezone.now())
+
+
 class ProductCollectionSerializer(serializers.ModelSerializer):
     """
     Serializer для подборок товаров.
@@ -168,32 +270,95 @@ class ProductCollectionSerializer(serializers.ModelSerializer):
         fields = ('id', 'title', 'text', 'products', 'created_at', 'updated_at')
 
     def validate(self, data):
-        products = self.context['request'].data['products']
+        """
+        Проверка списка товаров подборки. Без products при обновлении состав не меняется.
+        """
+        request_data = self.context['request'].data
+        if 'products' in request_data:
+            data['product_ids'] = self.resolve_product_ids(request_data['products'])
+        elif self.instance is None:
+            data['product_ids'] = []
+        return data
+
+    @staticmethod
+    def resolve_product_ids(products):
+        """
+        id товаров из [{"product_id": ...}, ...]: повторы и существование проверяются одним запросом.
+        """
+        if not isinstance(products, list):
+            raise serializers.ValidationError('products должен быть списком')
         id_list = []
         for product in products:
-            if not Product.objects.filter(id=product['product_id']):
-                raise serializers.ValidationError(f"Товар с ID {product['product_id']} не существует")
-            id_list.append(product.get('product_id'))
-        if len(set(id_list)) != len(id_list):
+            product_id = product.get('product_id') if isinstance(product, dict) else None
+            if not isinstance(product_id, int) or isinstance(product_id, bool):
+                raise serializers.ValidationError('Каждый товар задаётся как {"product_id": <id>}')
+            id_list.append(product_id)
+        product_ids = set(id_list)
+        if len(product_ids) != len(id_list):
             raise serializers.ValidationError("Товар в одной подборке не может повторяться")
-        return data
+        missing_ids = product_ids - set(Product.objects.filter(id__in=product_ids).values_list('id', flat=True))
+        if missing_ids:
+            raise serializers.ValidationError(f'Товар с ID {min(missing_ids)} не существует')
+        return id_list
 
+    @transaction.atomic
     def create(self, validated_data):
-        product_ids_list = []
-        products = self.context['request'].data['products']
-        for product in products:
-            product_ids_list.append(product['product_id'])
-        validated_data['products'] = Product.objects.filter(id__in=product_ids_list)
-        return super().create(validated_data)
+        product_ids = validated_data.pop('product_ids')
+        instance = ProductCollection.objects.create(**validated_data)
+        instance.products.add(*product_ids)
+        return instance
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        product_ids_list = []
-        products = self.context['request'].data['products']
-        for product in products:
-            product_ids_list.append(product['product_id'])
-        instance.products.clear()
-        instance.products.add(*product_ids_list)
+        """
+        set() меняет только разницу: удаляет убранные товары и добавляет новые.
+        """
+        product_ids = validated_data.pop('product_ids', None)
+        if product_ids is not None:
+            instance.products.set(product_ids)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
         return instance
+
+
+
+class CollectionProductsSerializer(serializers.Serializer):
+    """
+    Serializer для тела add-products / remove-products: {"products": [{"product_id": ...}]}.
+    """
+    products = serializers.ListField(child=serializers.DictField())
+
+    def validate_products(self, products):
+        return ProductCollectionSerializer.resolve_product_ids(products)
+
+class ProductSalesReportSerializer(serializers.Serializer):
+    """
+    Serializer для строк отчёта по витрине продаж товаров; day и product выводятся,
+    только если по ним группировали.
+    """
+    day = serializers.DateField(required=False)
+    product = serializers.IntegerField(source='product_id', required=False)
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=None, decimal_places=2)
+    orders_count = serializers.IntegerField()
+
+
+class OrderStatsReportSerializer(serializers.Serializer):
+    """
+    Serializer для строк отчёта по витрине заказов; day и status выводятся,
+    только если по ним группировали.
+    """
+    day = serializers.DateField(required=False)
+    status = serializers.CharField(required=False)
+    orders_count = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=None, decimal_places=2)
+
+
+class AnalyticsSummarySerializer(serializers.Serializer):
+    """
+    Serializer для итогов по витринам за период.
+    """
+    orders_count = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=None, decimal_places=2)
+    units = serializers.IntegerField()
@@ -0,0 +1,124 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from api_store.analytics import record_sales
+from api_store.authentication import CachedTokenAuthentication
+from api_store.caching import invalidate_collection, invalidate_product
+from api_store.models import Order, Product, ProductReview, ProductCollection
+from api_store.ratings import apply_rating_delta
+from api_store.search import update_product_search_vector
+
+SEARCH_FIELDS = {'name', 'description'}
+
+
+def get_product_collection_ids(product_id, using):
+    return list(
+        ProductCollection.products.through.objects.using(using)
+        .filter(product_id=product_id)
+        .values_list('productcollection_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Product)
+def sync_product_search_vector(sender, instance, using, update_fields=None, **kwargs):
+    """
+    Обновление поискового вектора после сохранения товара.
+    При удалении строка вместе с вектором уходит из GIN-индекса сама.
+    """
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+        return
+    update_product_search_vector(Product.objects.using(using).filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=ProductReview)
+def sync_product_rating(sender, instance, using, created, **kwargs):
+    """
+    Приращение средней оценки и количества отзывов товара после сохранения отзыва
+    (API, админка). При переносе отзыва на другой товар оценка вычитается из прежнего.
+    """
+    loaded_product_id = getattr(instance, '_loaded_product_id', None)
+    loaded_rating = getattr(instance, '_loaded_rating', None)
+    if created or loaded_product_id is None:
+        apply_rating_delta(instance.product_id, instance.rating, 1, using=using)
+    elif loaded_product_id != instance.product_id:
+        apply_rating_delta(loaded_product_id, -loaded_rating, -1, using=using)
+        apply_rating_delta(instance.product_id, instance.rating, 1, using=using)
+    elif loaded_rating != instance.rating:
+        apply_rating_delta(instance.product_id, instance.rating - loaded_rating, 0, using=using)
+    invalidate_review_products(instance, using)
+
+
+@receiver(post_delete, sender=ProductReview)
+def sync_product_rating_on_delete(sender, instance, using, **kwargs):
+    """
+    Вычитание удалённого отзыва (API, админка, каскадное удаление) из агрегатов товара.
+    """
+    product_id = getattr(instance, '_loaded_product_id', None) or instance.product_id
+    rating = getattr(instance, '_loaded_rating', None) or instance.rating
+    apply_rating_delta(product_id, -rating, -1, using=using)
+    invalidate_review_products(instance, using)
+
+
+def invalidate_review_products(instance, using):
+    loaded_product_id = getattr(instance, '_loaded_product_id', None)
+    for product_id in {instance.product_id, loaded_product_id} - {None}:
+        invalidate_product(product_id, get_product_collection_ids(product_id, using))
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    """
+    Сброс кэша аутентификации при удалении токена.
+    """
+    CachedTokenAuthentication.invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user_tokens(sender, instance, created, **kwargs):
+    """
+    Сброс кэша аутентификации при изменении пользователя (деактивация, права).
+    """
+    if not created:
+        CachedTokenAuthentication.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(pre_delete, sender=Product)
+def invalidate_product_responses(sender, instance, using, **kwargs):
+    """
+    Сброс кэша ответов товара, списков и подборок, в которые он входит.
+    """
+    invalidate_product(instance.pk, get_product_collection_ids(instance.pk, using))
+
+
+@receiver(post_save, sender=ProductCollection)
+@receiver(post_delete, sender=ProductCollection)
+def invalidate_collection_responses(sender, instance, **kwargs):
+    """
+    Сброс кэша ответов подборки.
+    """
+    invalidate_collection(instance.pk)
+
+
+@receiver(m2m_changed, sender=ProductCollection.products.through)
+def invalidate_collection_products_responses(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """
+    Сброс кэша ответов подборок при изменении состава товаров.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_collection(instance.pk)
+    elif action == 'pre_clear':
+        invalidate_collection(*get_product_collection_ids(instance.pk, using))
+    else:
+        invalidate_collection(*pk_set)
+
+
+@receiver(pre_delete, sender=Order)
+def remove_order_sales(sender, instance, using, **kwargs):
+    """
+    Вычитание заказа из витрин продаж до удаления (позиции удаляются каскадом позже).
+    """
+    record_sales(Order.objects.using(using).filter(pk=instance.pk), sign=-1)
@@ -0,0 +1,99 @@
+from decimal import Decimal
+
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from api_store.analytics import track_sales
+from api_store.models import Order, OrderStatusChoices, Position, Product
+
+REPRICE_BATCH_SIZE = 10000
+TOTAL_AMOUNT_FIELD = Order._meta.get_field('total_amount')
+TOTAL_PRICE_FIELD = Position._meta.get_field('total_price')
+
+
+def get_total_output_field(field=TOTAL_AMOUNT_FIELD):
+    return DecimalField(max_digits=field.max_digits, decimal_places=field.decimal_places)
+
+
+def positions_total():
+    """
+    Сумма стоимостей позиций заказа (без соединения с товарами); 0 для заказа без позиций.
+    """
+    positions = (
+        Position.objects
+        .filter(order=OuterRef('pk'))
+        .order_by()
+        .values('order')
+        .annotate(total=Sum('total_price'))
+        .values('total')
+    )
+    return Coalesce(
+        Subquery(positions, output_field=get_total_output_field()),
+        Value(Decimal('0.00'), output_field=get_total_output_field()),
+    )
+
+
+def refresh_order_totals(queryset):
+    """
+    Пересчёт total_amount заказов из queryset одним UPDATE на стороне базы.
+
+    Обновляются только заказы, сумма которых изменилась; у них же сдвигается updated_at.
+    Возвращает число обновлённых заказов.
+    """
+    total = positions_total()
+    return (
+        queryset
+        .exclude(total_amount=total)
+        .update(total_amount=total, updated_at=timezone.now())
+    )
+
+
+def refresh_order_total(*order_ids, using=None):
+    return refresh_order_totals(Order.objects.using(using).filter(pk__in=order_ids))
+
+
+def refresh_position_prices(queryset):
+    """
+    Перенос текущих цен товаров в позиции из queryset одним UPDATE.
+    Обновляются только позиции, цена которых отличается от цены товара.
+    """
+    price = Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price')[:1])
+    return (
+        queryset
+        .exclude(unit_price=price)
+        .update(
+            unit_price=price,
+            total_price=ExpressionWrapper(F('quantity') * price, output_field=get_total_output_field(TOTAL_PRICE_FIELD)),
+        )
+    )
+
+
+def iter_id_batches(queryset, batch_size=REPRICE_BATCH_SIZE):
+    """
+    Разбиение queryset на пакеты по диапазонам id: на каждый пакет один запрос
+    за границей диапазона, id в Python не загружаются.
+    """
+    queryset = queryset.order_by('id')
+    last_id = 0
+    while True:
+        batch = queryset.filter(id__gt=last_id)
+        bound = list(batch.values_list('id', flat=True)[batch_size - 1:batch_size])
+        if not bound:
+            yield batch
+            return
+        yield batch.filter(id__lte=bound[0])
+        last_id = bound[0]
+
+
+def reprice_orders(statuses=(OrderStatusChoices.NEW,), batch_size=REPRICE_BATCH_SIZE, using=None):
+    """
+    Пересчёт открытых заказов по текущим ценам каталога: цены позиций и суммы
+    заказов обновляются пакетами, по два UPDATE на пакет, вместе с витринами продаж.
+    Возвращает число изменённых заказов.
+    """
+    updated = 0
+    for batch in iter_id_batches(Order.objects.using(using).filter(status__in=statuses), batch_size):
+        with track_sales(batch):
+            refresh_position_prices(Position.objects.using(using).filter(order__in=batch.values('pk')))
+            updated += refresh_order_totals(batch)
+    return updated
@@ -1,22 +1,42 @@
+from django.db import transaction
+from django.db.models import DecimalField, Prefetch, Sum, Value
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.viewsets import ModelViewSet
-from api_store.filters import ProductFilter, OrderFilter, ProductReviewFilter
-from api_store.models import Product, Order, ProductReview, ProductCollection
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
+from api_store.analytics import ZERO
+from api_store.bulk import import_orders
+from api_store.caching import CachedResponseMixin
+from api_store.export import StreamingExportMixin
+from api_store.fast_serializers import FastListMixin, FastProductSerializer, FastOrderSerializer
+from api_store.filters import ProductFilter, OrderFilter, ProductReviewFilter, DailyOrderStatsFilter, \
+    DailyProductSalesFilter
+from api_store.models import Product, Order, ProductReview, ProductCollection, Position, DailyOrderStats, \
+    DailyProductSales
+from api_store.routers import ReplicaRoutingMixin
 from api_store.serializers import ProductSerializer, OrderSerializer, ProductCollectionSerializer, \
-    ProductReviewSerializer
+    ProductReviewSerializer, OrderStatusTransitionSerializer, ProductSalesReportSerializer, OrderStatsReportSerializer, \
+    AnalyticsSummarySerializer, CollectionProductsSerializer
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from api_store.permissions import IsAdminOrOwner
 
 
-class ProductsViewSet(ModelViewSet):
+class ProductsViewSet(ReplicaRoutingMixin, CachedResponseMixin, StreamingExportMixin, FastListMixin, ModelViewSet):
     """
     Set для товаров.
     """
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    fast_serializer_class = FastProductSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = ProductFilter
     http_method_names = ['get', 'post', 'put', 'delete']
+    cache_list_namespaces = ('product-list',)
+    cache_detail_namespace = 'product'
 
     def get_permissions(self):
         """
@@ -29,35 +49,78 @@ class ProductsViewSet(ModelViewSet):
         return [permission() for permission in permissions]
 
 
-class OrdersViewSet(ModelViewSet):
+# Позиции в порядке добавления, как и в FastOrderSerializer.
+ORDER_POSITIONS_PREFETCH = Prefetch('positions', queryset=Position.objects.order_by('id'))
+
+
+class OrdersViewSet(ReplicaRoutingMixin, StreamingExportMixin, FastListMixin, ModelViewSet):
     """
     ModelViewSet для заказов.
     """
-    queryset = Order.objects.all().prefetch_related('products').select_related('user')
+    queryset = Order.objects.all().prefetch_related(ORDER_POSITIONS_PREFETCH).select_related('user')
     serializer_class = OrderSerializer
+    fast_serializer_class = FastOrderSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = OrderFilter
     http_method_names = ['get', 'post', 'put', 'patch', 'delete']
+    export_prefetch_related = (ORDER_POSITIONS_PREFETCH,)
+    # Заказы читаются только с основной базы; изменения закрепляют пользователя за ней.
+    replica_reads = False
+
+    def get_queryset(self):
+        """
+        Пользователь видит только свои заказы, админ - все.
+        Ограничение в SQL действует для всех действий, чужой заказ - 404.
+        """
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none()
+        if not user.is_staff:
+            queryset = queryset.filter(user=user)
+        return queryset
 
-    def list(self, request, *args, **kwargs):
-        if not request.user.is_staff:
-            self.queryset = self.queryset.filter(user=request.user)
-        return super().list(request, *args, **kwargs)
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Импорт заказов из NDJSON: одна строка - один заказ в формате create.
+        В ответ построчно стримятся результаты: id заказа или ошибки валидации.
+        """
+        return StreamingHttpResponse(
+            import_orders(request.stream or (), request),
+            content_type='application/x-ndjson',
+        )
+
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_status(self, request):
+        """
+        Массовая смена статуса {"status": ..., "ids": [...]}: заказы выбираются по ids
+        и/или фильтрам OrderFilter из query string и меняются одним UPDATE.
+        """
+        serializer = OrderStatusTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        filterset = self.filterset_class(request.query_params, queryset=Order.objects.all(), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        # Без ids и фильтров запрос изменил бы все заказы.
+        if 'ids' not in serializer.validated_data and not filterset.form.has_changed():
+            raise ValidationError('Укажите ids или фильтр заказов')
+        return Response({'updated': serializer.transition(filterset.qs)})
 
     def get_permissions(self):
         """Получение прав для действий с заказами.
         retrieve, list, create, update, destroy."""
 
-        if self.action in ['retrieve', 'list', 'update', 'partial_update', 'destroy']:
-            permissions = [IsAuthenticated, IsAdminOrOwner]
-        elif self.action == 'create':
+        if self.action in ['retrieve', 'list', 'update', 'partial_update', 'destroy', 'create', 'bulk']:
             permissions = [IsAuthenticated]
+        elif self.action == 'bulk_status':
+            permissions = [IsAdminUser]
         else:
             permissions = []
         return [permission() for permission in permissions]
 
 
-class ProductReviewsViewSet(ModelViewSet):
+class ProductReviewsViewSet(ReplicaRoutingMixin, ModelViewSet):
     """
     ModelViewSet для отзывов к товару.
     """
@@ -67,27 +130,147 @@ class ProductReviewsViewSet(ModelViewSet):
     filterset_class = ProductReviewFilter
     http_method_names = ['get', 'post', 'put', 'delete']
 
+    @action(detail=False, methods=['put'], url_path=r'by-product/(?P<product_id>\d+)')
+    def upsert(self, request, product_id=None):
+        """
+        Создание или обновление отзыва текущего пользователя на товар одним запросом.
+        """
+        data = request.data.copy()
+        data['product_id'] = product_id
+        serializer = self.get_serializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        created = serializer.upsert()
+        return Response(serializer.data, status=HTTP_201_CREATED if created else HTTP_200_OK)
+
     def get_permissions(self):
         if self.action in ['update', 'partial_update', 'destroy']:
             permissions = [IsAdminOrOwner]
-        elif self.action == 'create':
+        elif self.action in ['create', 'upsert']:
             permissions = [IsAuthenticated]
         else:
             permissions = []
         return [permission() for permission in permissions]
 
 
-class ProductCollectionsViewSet(ModelViewSet):
+class ProductCollectionsViewSet(ReplicaRoutingMixin, CachedResponseMixin, ModelViewSet):
     """
     ModelViewSet для отзывов к товару.
     """
     queryset = ProductCollection.objects.all().prefetch_related('products')
     serializer_class = ProductCollectionSerializer
     http_method_names = ['get', 'post', 'put', 'delete']
+    cache_list_namespaces = ('collection-list',)
+    cache_detail_namespace = 'collection'
+
+    def get_queryset(self):
+        # Добавление и удаление отдельных товаров не загружает весь состав подборки.
+        if self.action in ['add_products', 'remove_products']:
+            return ProductCollection.objects.all()
+        return super().get_queryset()
+
+    def get_product_ids(self, request):
+        serializer = CollectionProductsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return set(serializer.validated_data['products'])
+
+    @action(detail=True, methods=['post'], url_path='add-products')
+    def add_products(self, request, pk=None):
+        """
+        Добавление товаров {"products": [{"product_id": ...}]} без передачи всего состава.
+        """
+        collection = self.get_object()
+        product_ids = self.get_product_ids(request)
+        with transaction.atomic():
+            new_ids = product_ids - set(collection.products.filter(id__in=product_ids).values_list('id', flat=True))
+            if new_ids:
+                collection.products.add(*new_ids)
+                collection.save(update_fields=['updated_at'])
+        return Response({'added': sorted(new_ids)})
+
+    @action(detail=True, methods=['post'], url_path='remove-products')
+    def remove_products(self, request, pk=None):
+        """
+        Удаление товаров {"products": [{"product_id": ...}]} из подборки.
+        """
+        collection = self.get_object()
+        product_ids = self.get_product_ids(request)
+        with transaction.atomic():
+            removed_ids = set(collection.products.filter(id__in=product_ids).values_list('id', flat=True))
+            if removed_ids:
+                collection.products.remove(*removed_ids)
+                collection.save(update_fields=['updated_at'])
+        return Response({'removed': sorted(removed_ids)})
 
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'add_products', 'remove_products']:
             permissions = [IsAdminUser]
         else:
             permissions = []
         return [permission() for permission in permissions]
+
+
+class AnalyticsViewSet(ReplicaRoutingMixin, GenericViewSet):
+    """
+    ViewSet отчётов по витринам продаж (только чтение, только админы).
+    Период задаётся параметрами day_after / day_before (YYYY-MM-DD).
+    """
+    permission_classes = [IsAdminUser]
+    product_group_fields = {'day': 'day', 'product': 'product_id'}
+    order_group_fields = {'day': 'day', 'status': 'status'}
+
+    def filter_rollup(self, queryset, filterset_class):
+        filterset = filterset_class(self.request.query_params, queryset=queryset, request=self.request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return filterset.qs
+
+    def get_group_by(self, group_fields):
+        """
+        Поля группировки из ?group_by=day,product; по умолчанию - по дням.
+        """
+        names = [name for name in self.request.query_params.get('group_by', 'day').split(',') if name]
+        unknown = set(names) - group_fields.keys()
+        if unknown or not names:
+            raise ValidationError({'group_by': f"Допустимые значения: {', '.join(group_fields)}"})
+        return [group_fields[name] for name in dict.fromkeys(names)]
+
+    def list(self, request):
+        """
+        Итоги за период: заказы и их сумма (с учётом status), проданные единицы (с учётом product).
+        """
+        orders = self.filter_rollup(DailyOrderStats.objects.all(), DailyOrderStatsFilter).aggregate(
+            orders_count=Coalesce(Sum('orders_count'), Value(0)),
+            revenue=Coalesce(Sum('revenue'), Value(ZERO), output_field=DecimalField()),
+        )
+        sales = self.filter_rollup(DailyProductSales.objects.all(), DailyProductSalesFilter).aggregate(
+            units=Coalesce(Sum('units'), Value(0)),
+        )
+        return Response(AnalyticsSummarySerializer({**orders, **sales}).data)
+
+    @action(detail=False, methods=['get'])
+    def products(self, request):
+        """
+        Продажи товаров за период, сгруппированные по ?group_by=day|product|day,product.
+        """
+        group_by = self.get_group_by(self.product_group_fields)
+        rows = (
+            self.filter_rollup(DailyProductSales.objects.all(), DailyProductSalesFilter)
+            .values(*group_by)
+            .annotate(units=Sum('units'), revenue=Sum('revenue'), orders_count=Sum('orders_count'))
+            .order_by(*group_by)
+        )
+        return Response(ProductSalesReportSerializer(rows, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def orders(self, request):
+        """
+        Заказы за период, сгруппированные по ?group_by=day|status|day,status.
+        """
+        group_by = self.get_group_by(self.order_group_fields)
+        rows = (
+            self.filter_rollup(DailyOrderStats.objects.all(), DailyOrderStatsFilter)
+            .values(*group_by)
+            .annotate(orders_count=Sum('orders_count'), revenue=Sum('revenue'))
+            .order_by(*group_by)
+        )
+        return Response(OrderStatsReportSerializer(rows, many=True).data)
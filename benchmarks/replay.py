@@ -0,0 +1,262 @@
+"""
+Нагрузочный прогон: запросы из requests-examples.http (или записанного NDJSON-лога)
+конкурентно воспроизводятся против локально запущенного WSGI-сервера на отдельной
+тестовой базе с данными из fixtures.json.
+
+    python -m benchmarks.replay --requests 2000 --concurrency 8 --output replay.json
+    python -m benchmarks.replay --log traffic.ndjson --seed-size 10000
+
+Отчёт по каждому endpoint: число запросов, коды ответов, p50/p95/p99 задержки,
+среднее число SQL-запросов; общий throughput.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+REQUEST_LINE_RE = re.compile(r'^(GET|POST|PUT|PATCH|DELETE|HEAD|OPTIONS)\s+(\S+)')
+ID_SEGMENT_RE = re.compile(r'/\d+(?=/|$)')
+
+
+def parse_http_file(text):
+    """
+    Разбор файла в формате HTTP Client (JetBrains/VS Code REST Client):
+    блоки разделены ###, строки # - комментарии, затем строка запроса,
+    заголовки, пустая строка и тело.
+    """
+    requests = []
+    for block in re.split(r'^###.*$', text, flags=re.MULTILINE):
+        lines = [line for line in block.strip().splitlines() if not line.lstrip().startswith('#')]
+        while lines and not lines[0].strip():
+            lines.pop(0)
+        if not lines:
+            continue
+        match = REQUEST_LINE_RE.match(lines[0].strip())
+        if not match:
+            continue
+        method, url = match.groups()
+        headers = {}
+        body_lines = []
+        in_body = False
+        for line in lines[1:]:
+            if in_body:
+                body_lines.append(line)
+            elif not line.strip():
+                in_body = True
+            else:
+                name, _, value = line.partition(':')
+                headers[name.strip()] = value.strip()
+        body = '\n'.join(body_lines).strip()
+        requests.append({'method': method, 'url': url, 'headers': headers, 'body': body or None})
+    return requests
+
+
+def parse_traffic_log(lines):
+    """
+    Записанный трафик: NDJSON со строками {"method", "url", "headers", "body"}.
+    """
+    requests = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            item = json.loads(line)
+            requests.append({
+                'method': item['method'].upper(),
+                'url': item['url'],
+                'headers': item.get('headers') or {},
+                'body': item.get('body'),
+            })
+    return requests
+
+
+def get_path(url):
+    if '://' not in url:
+        url = f'http://{url}'
+    parts = urlsplit(url)
+    return parts.path + (f'?{parts.query}' if parts.query else '')
+
+
+def get_endpoint(method, path):
+    """
+    Имя endpoint: метод и путь без query string, id заменены на {id}.
+    """
+    return f"{method} {ID_SEGMENT_RE.sub('/{id}', path.split('?', 1)[0])}"
+
+
+def percentile(values, percent):
+    """
+    Перцентиль методом ближайшего ранга.
+    """
+    values = sorted(values)
+    if not values:
+        return None
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class QueryCountingApplication:
+    """
+    WSGI-обёртка, считающая SQL-запросы каждого запроса через connection.execute_wrapper.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.lock = threading.Lock()
+        self.queries = {}
+
+    def __call__(self, environ, start_response):
+        from django.db import connection
+
+        count = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal count
+            count += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(counter):
+            result = self.application(environ, start_response)
+            try:
+                body = b''.join(result)
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        path = environ.get('PATH_INFO', '')
+        endpoint = get_endpoint(environ['REQUEST_METHOD'], path)
+        with self.lock:
+            self.queries.setdefault(endpoint, []).append(count)
+        return [body]
+
+
+def send(base_url, request, timeout):
+    path = get_path(request['url'])
+    data = request['body'].encode() if request['body'] else None
+    http_request = urllib.request.Request(base_url + path, data=data, method=request['method'])
+    for name, value in request['headers'].items():
+        http_request.add_header(name, value)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(http_request, timeout=timeout) as response:
+            response.read()
+            status, final_url = response.status, response.url
+    except urllib.error.HTTPError as error:
+        error.read()
+        status, final_url = error.code, error.url
+    # После редиректа (APPEND_SLASH) endpoint - конечный URL, как на стороне сервера.
+    method = request['method'] if final_url == base_url + path else 'GET'
+    return get_endpoint(method, get_path(final_url)), status, (time.perf_counter() - started) * 1000
+
+
+def replay(base_url, requests, total, concurrency, timeout=30):
+    mix = itertools.islice(itertools.cycle(requests), total)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda request: send(base_url, request, timeout), mix))
+    return results, time.perf_counter() - started
+
+
+def build_report(results, elapsed, queries):
+    endpoints = {}
+    for endpoint, status, latency in results:
+        item = endpoints.setdefault(endpoint, {'latencies': [], 'statuses': {}})
+        item['latencies'].append(latency)
+        item['statuses'][str(status)] = item['statuses'].get(str(status), 0) + 1
+    report = {
+        'total_requests': len(results),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(results) / elapsed, 2) if elapsed else None,
+        'endpoints': {},
+    }
+    for endpoint, item in sorted(endpoints.items()):
+        latencies = item['latencies']
+        endpoint_queries = queries.get(endpoint, [])
+        report['endpoints'][endpoint] = {
+            'count': len(latencies),
+            'statuses': item['statuses'],
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'queries_mean': round(statistics.mean(endpoint_queries), 2) if endpoint_queries else None,
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Нагрузочный прогон запросов api_store.')
+    parser.add_argument('--http-file', default='requests-examples.http')
+    parser.add_argument('--log', help='NDJSON-лог трафика вместо http-файла')
+    parser.add_argument('--fixtures', default='fixtures.json')
+    parser.add_argument('--seed-size', type=int, default=0, help='дополнительный объём данных (см. benchmarks.suite)')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--output', help='JSON-файл отчёта')
+    args = parser.parse_args(argv)
+
+    if args.log:
+        with open(args.log, encoding='utf-8') as log:
+            requests = parse_traffic_log(log)
+    else:
+        with open(args.http_file, encoding='utf-8') as http_file:
+            requests = parse_http_file(http_file.read())
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_diplom_project.settings')
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connection
+
+    settings.ALLOWED_HOSTS = ['*']
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    server = None
+    try:
+        call_command('loaddata', args.fixtures, verbosity=0)
+        if args.seed_size:
+            import random
+            from benchmarks.suite import seed
+            seed(args.seed_size, random.Random(0))
+        application = QueryCountingApplication(get_wsgi_application())
+        server = make_server('127.0.0.1', 0, application, server_class=ThreadingWSGIServer, handler_class=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        results, elapsed = replay(base_url, requests, args.requests, args.concurrency)
+        report = build_report(results, elapsed, application.queries)
+    finally:
+        if server is not None:
+            server.shutdown()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+    print(f"{report['total_requests']} requests in {report['elapsed_s']} s, {report['throughput_rps']} rps")
+    for endpoint, item in report['endpoints'].items():
+        print(f"{endpoint:<45} {item['count']:>6} p50 {item['p50_ms']:>9.2f} p95 {item['p95_ms']:>9.2f} "
+              f"p99 {item['p99_ms']:>9.2f} ms  queries {item['queries_mean']}  {item['statuses']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
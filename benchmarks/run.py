@@ -0,0 +1,76 @@
+"""
+Запуск бенчмарков на отдельной тестовой базе с записью результатов в JSON.
+
+    python -m benchmarks.run --sizes 100 10000 100000 --output bench.json
+    python -m benchmarks.run --baseline bench.json --threshold 1.2
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Микро-бенчмарки api_store.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=None)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench.json')
+    parser.add_argument('--baseline', help='JSON предыдущего прогона для сравнения')
+    parser.add_argument('--threshold', type=float, default=1.2)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_diplom_project.settings')
+    import django
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from benchmarks.suite import DEFAULT_SIZES, compare, run_suite
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        results = run_suite(sizes=args.sizes or DEFAULT_SIZES, repeat=args.repeat, seed_value=args.seed)
+        report = {
+            'meta': {
+                'commit': get_commit(),
+                'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            'results': results,
+        }
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(report, output, ensure_ascii=False, indent=2)
+    for item in results:
+        print(f"{item['name']:<40} {str(item['size']):>7} {item['wall_ms']['median']:>12.3f} ms {item['queries']:>5} q")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            regressions = compare(results, json.load(baseline_file)['results'], args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['name']} [{regression['size']}]: "
+                  f"{regression['before']['wall_ms']['median']} -> {regression['after']['wall_ms']['median']} ms, "
+                  f"{regression['before']['queries']} -> {regression['after']['queries']} queries")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Набор микро-бенчмарков api_store: сериализация списков, построение запросов
+фильтров и создание заказа. Каждый замер фиксирует время и число SQL-запросов.
+"""
+import decimal
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from api_store.fast_serializers import FastOrderSerializer, FastProductSerializer
+from api_store.filters import OrderFilter, ProductFilter
+from api_store.models import Order, OrderStatusChoices, Position, Product, ProductCollection, ProductReview
+from api_store.serializers import OrderSerializer, ProductCollectionSerializer, ProductReviewSerializer, \
+    ProductSerializer
+
+DEFAULT_SIZES = (100, 10000, 100000)
+SEED_BATCH_SIZE = 5000
+USERS_COUNT = 1000
+POSITIONS_PER_ORDER = 3
+PRODUCTS_PER_COLLECTION = 10
+ORDER_CREATE_POSITIONS = (1, 10, 50)
+
+
+def seed(size, rnd):
+    """
+    Данные для самого большого размера: меньшие размеры берутся срезом queryset.
+    """
+    User.objects.bulk_create(
+        (User(username=f'bench_user_{number}') for number in range(USERS_COUNT)), batch_size=SEED_BATCH_SIZE
+    )
+    user_ids = list(User.objects.values_list('id', flat=True))
+    Product.objects.bulk_create(
+        (Product(name=f'Товар {number}', description='Описание товара ' * 20,
+                 price=decimal.Decimal(rnd.randrange(100, 1000000)) / 100)
+         for number in range(max(size, max(ORDER_CREATE_POSITIONS)))),
+        batch_size=SEED_BATCH_SIZE,
+    )
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    Order.objects.bulk_create(
+        (Order(user_id=rnd.choice(user_ids), status=rnd.choice(OrderStatusChoices.values),
+               total_amount=decimal.Decimal(rnd.randrange(100, 1000000)) / 100)
+         for _ in range(size)),
+        batch_size=SEED_BATCH_SIZE,
+    )
+    Position.objects.bulk_create(
+        (Position(order_id=order_id, product_id=product_id, quantity=rnd.randint(1, 5))
+         for order_id in Order.objects.values_list('id', flat=True).iterator()
+         for product_id in rnd.sample(product_ids, POSITIONS_PER_ORDER)),
+        batch_size=SEED_BATCH_SIZE,
+    )
+    ProductReview.objects.bulk_create(
+        (ProductReview(user_id=user_ids[number % len(user_ids)], product_id=product_id,
+                       text='Отзыв', rating=rnd.randint(1, 5))
+         for number, product_id in enumerate(product_ids)),
+        batch_size=SEED_BATCH_SIZE,
+    )
+    collections_count = max(1, size // PRODUCTS_PER_COLLECTION)
+    ProductCollection.objects.bulk_create(
+        (ProductCollection(title=f'Подборка {number}', text='Текст') for number in range(collections_count)),
+        batch_size=SEED_BATCH_SIZE,
+    )
+    through = ProductCollection.products.through
+    through.objects.bulk_create(
+        (through(productcollection_id=collection_id, product_id=product_id)
+         for collection_id in ProductCollection.objects.values_list('id', flat=True).iterator()
+         for product_id in rnd.sample(product_ids, PRODUCTS_PER_COLLECTION)),
+        batch_size=SEED_BATCH_SIZE,
+    )
+
+
+def measure(name, size, func, repeat):
+    timings = []
+    queries = None
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = len(captured)
+    return {
+        'name': name,
+        'size': size,
+        'wall_ms': {
+            'min': round(min(timings), 3),
+            'median': round(statistics.median(timings), 3),
+            'mean': round(statistics.mean(timings), 3),
+        },
+        'queries': queries,
+        'repeat': repeat,
+    }
+
+
+def list_cases(size):
+    """
+    Рендеринг списков: тот же набор запросов, что и во view.
+    """
+    products = Product.objects.all()[:size]
+    orders = Order.objects.all().select_related('user').prefetch_related('positions')[:size]
+    reviews = ProductReview.objects.all().select_related('product', 'user')[:size]
+    collections = ProductCollection.objects.all().prefetch_related('products')[:max(1, size // PRODUCTS_PER_COLLECTION)]
+    return {
+        'product_serializer_list': lambda: ProductSerializer(products.all(), many=True).data,
+        'fast_product_serializer_list': lambda: FastProductSerializer(products.all()).data,
+        'order_serializer_list': lambda: OrderSerializer(orders.all(), many=True).data,
+        'fast_order_serializer_list': lambda: FastOrderSerializer(Order.objects.all()[:size]).data,
+        'product_review_serializer_list': lambda: ProductReviewSerializer(reviews.all(), many=True).data,
+        'product_collection_serializer_list': lambda: ProductCollectionSerializer(collections.all(), many=True).data,
+    }
+
+
+def filter_cases():
+    """
+    Построение запросов фильтров без обращения к базе.
+    """
+    product_params = {'name': 'Товар 1', 'description': 'описание', 'min_price': '100', 'max_price': '5000',
+                      'min_rating': '3', 'ordering': '-rating_avg'}
+    order_params = {'status': 'NEW', 'total_amount_from': '100', 'total_amount_to': '5000',
+                    'created_at_after': '2021-01-01', 'created_at_before': '2021-12-31'}
+    return {
+        'product_filter_query': lambda: str(ProductFilter(product_params, queryset=Product.objects.all()).qs.query),
+        'order_filter_query': lambda: str(OrderFilter(order_params, queryset=Order.objects.all()).qs.query),
+    }
+
+
+def order_create_case(positions_count, user, product_ids):
+    payload = {'products': [{'product': product_id, 'quantity': 2} for product_id in product_ids[:positions_count]]}
+    request = SimpleNamespace(user=user, data=payload)
+
+    def create():
+        with transaction.atomic():
+            serializer = OrderSerializer(data=payload, context={'request': request})
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            transaction.set_rollback(True)
+    return create
+
+
+def run_suite(sizes=DEFAULT_SIZES, repeat=5, seed_value=0):
+    """
+    Заполнение базы и прогон всех бенчмарков. Возвращает список результатов.
+    """
+    sizes = sorted(sizes)
+    seed(sizes[-1], random.Random(seed_value))
+    results = []
+    for size in sizes:
+        for name, func in list_cases(size).items():
+            results.append(measure(name, size, func, repeat))
+    for name, func in filter_cases().items():
+        results.append(measure(name, None, func, repeat))
+    user = User.objects.order_by('id').first()
+    product_ids = list(Product.objects.order_by('id').values_list('id', flat=True)[:max(ORDER_CREATE_POSITIONS)])
+    for positions_count in ORDER_CREATE_POSITIONS:
+        if positions_count <= len(product_ids):
+            func = order_create_case(positions_count, user, product_ids)
+            results.append(measure('order_serializer_create', positions_count, func, repeat))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Регрессии относительно baseline: медианное время выросло более чем в threshold раз
+    или выросло число запросов.
+    """
+    previous = {(item['name'], item['size']): item for item in baseline}
+    regressions = []
+    for item in results:
+        before = previous.get((item['name'], item['size']))
+        if before is None:
+            continue
+        slower = item['wall_ms']['median'] > before['wall_ms']['median'] * threshold
+        more_queries = (item['queries'] or 0) > (before['queries'] or 0)
+        if slower or more_queries:
+            regressions.append({'name': item['name'], 'size': item['size'], 'before': before, 'after': item})
+    return regressions
@@ -10,21 +10,49 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+from dotenv import load_dotenv
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Настройки читаются из окружения и файла .env в корне проекта.
+# DJANGO_ENV=production включает production-профиль, по умолчанию - разработка.
+load_dotenv(BASE_DIR / '.env')
+
+
+def env_bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default):
+    value = os.getenv(name)
+    return default if value in (None, '') else int(value)
+
+
+def env_list(name, default=''):
+    return [item.strip() for item in os.getenv(name, default).split(',') if item.strip()]
+
+
+PRODUCTION = os.getenv('DJANGO_ENV', 'development') == 'production'
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/3.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-z_ee993avp%5@y!dfl3%q^d(wwi+)bh1c*n-63p5o(c2ce^gfd'
+SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', 'django-insecure-z_ee993avp%5@y!dfl3%q^d(wwi+)bh1c*n-63p5o(c2ce^gfd')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# При DEBUG = True Django хранит в памяти каждый SQL-запрос запроса.
+DEBUG = env_bool('DJANGO_DEBUG', not PRODUCTION)
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS')
 
 # Application definition
 
@@ -35,6 +63,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'django_filters',
@@ -42,6 +71,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api_store.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,8 +101,50 @@ TEMPLATES = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
-    ]
+        'api_store.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'api_store.pagination.KeysetPagination',
+    'PAGE_SIZE': 100,
+}
+
+# Кэш token -> user для api_store.authentication.CachedTokenAuthentication.
+# CACHE_ALIAS - имя кэша из CACHES для общего кэша между процессами (None - только память процесса:
+# при нескольких воркерах отзыв токена доходит до остальных воркеров с задержкой до TTL секунд).
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+    'CACHE_ALIAS': 'default' if os.getenv('CACHE_BACKEND', 'locmem') != 'locmem' else None,
+}
+
+# CACHE_BACKEND=memcached и CACHE_LOCATION=host:11211[,host2:11211] - общий кэш для всех
+# процессов (нужен для кэша ответов и токенов при нескольких воркерах), иначе - память процесса.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'database': 'django.core.cache.backends.db.DatabaseCache',
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'locmem')],
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+        'TIMEOUT': env_int('CACHE_TIMEOUT', 300),
+    }
+}
+
+# Кэш GET-ответов товаров и подборок для анонимных пользователей (api_store.caching).
+# Для нескольких процессов CACHE_ALIAS должен указывать на общий кэш (memcached, redis).
+RESPONSE_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+# METRICS_DIR - общий каталог снимков метрик для нескольких процессов (gunicorn workers).
+# METRICS_ALLOWED_IPS - адреса и сети (через запятую), с которых доступен /metrics.
+METRICS = {
+    'DIRECTORY': os.getenv('METRICS_DIR') or None,
+    'FLUSH_INTERVAL': env_int('METRICS_FLUSH_INTERVAL', 5),
+    'ALLOWED_IPS': env_list('METRICS_ALLOWED_IPS', '127.0.0.1,::1'),
 }
 
 WSGI_APPLICATION = 'django_diplom_project.wsgi.application'
@@ -80,17 +152,56 @@ WSGI_APPLICATION = 'django_diplom_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# CONN_MAX_AGE - время жизни постоянного соединения в секундах (0 - новое на каждый запрос).
+# CONN_HEALTH_CHECKS - проверка постоянного соединения в начале запроса (api_store.db).
+# DB_PGBOUNCER=1 - работа через pgbouncer в режиме transaction pooling:
+# серверные курсоры отключаются, так как они не переживают смену серверного соединения.
+DB_PGBOUNCER = env_bool('DB_PGBOUNCER', False)
+
+
+def database(host, port):
+    return {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'api_store_db',
-        'HOST': '127.0.0.1',
-        'PORT': '5432',
-        'USER': 'genes',
-        'PASSWORD': 'genes'
+        'NAME': os.getenv('DB_NAME', 'api_store_db'),
+        'HOST': host,
+        'PORT': port,
+        'USER': os.getenv('DB_USER', 'genes'),
+        'PASSWORD': os.getenv('DB_PASSWORD', 'genes'),
+        'CONN_MAX_AGE': env_int('DB_CONN_MAX_AGE', 60 if PRODUCTION else 0),
+        'CONN_HEALTH_CHECKS': env_bool('DB_CONN_HEALTH_CHECKS', PRODUCTION),
+        'DISABLE_SERVER_SIDE_CURSORS': DB_PGBOUNCER,
+        'OPTIONS': {
+            'connect_timeout': env_int('DB_CONNECT_TIMEOUT', 5),
+        },
     }
+
+
+DATABASES = {
+    'default': database(os.getenv('DB_HOST', '127.0.0.1'), os.getenv('DB_PORT', '5432')),
 }
 
+# Реплики для чтения: алиасы из DATABASES. Безопасные запросы к товарам, отзывам
+# и подборкам читают с реплик (api_store.routers.ReplicaRouter), пользователь после
+# изменяющего запроса REPLICA_STICKY_SECONDS секунд читает с default.
+# DB_REPLICA_HOSTS=host1:5432,host2:5432 добавляет алиасы replica_1, replica_2...
+DATABASE_REPLICAS = []
+
+for number, replica in enumerate(env_list('DB_REPLICA_HOSTS'), start=1):
+    host, _, port = replica.partition(':')
+    alias = f'replica_{number}'
+    DATABASES[alias] = database(host, port or '5432')
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api_store.routers.ReplicaRouter']
+
+REPLICA_STICKY_SECONDS = 10
+
+# Отметка о чтении с default после записи хранится в кэше default: в памяти процесса
+# другие воркеры её не видят и сразу читают с реплики, которая могла ещё не получить запись.
+if DATABASE_REPLICAS and CACHES['default']['BACKEND'] == CACHE_BACKENDS['locmem']:
+    raise ImproperlyConfigured('DB_REPLICA_HOSTS requires a shared CACHE_BACKEND (memcached or database)')
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -131,3 +242,38 @@ STATIC_URL = '/static/'
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Тела запросов больше этого размера не читаются в память (загрузка через request.body/request.data).
+# Пакетный импорт заказов читает поток построчно и этим лимитом не ограничен.
+DATA_UPLOAD_MAX_MEMORY_SIZE = env_int('DJANGO_DATA_UPLOAD_MAX_MEMORY_SIZE', 5 * 1024 * 1024)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.getenv('DJANGO_LOG_LEVEL', 'WARNING'),
+    },
+    'loggers': {
+        'django.db.backends': {
+            'handlers': ['console'],
+            'level': os.getenv('DJANGO_DB_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+if PRODUCTION:
+    # DEBUG и логирование SQL на уровне DEBUG хранят/пишут каждый запрос к базе:
+    # в production такой конфигурацией не запускаемся.
+    if DEBUG:
+        raise ImproperlyConfigured('DJANGO_DEBUG must be off when DJANGO_ENV=production')
+    if LOGGING['loggers']['django.db.backends']['level'].upper() == 'DEBUG':
+        raise ImproperlyConfigured('DJANGO_DB_LOG_LEVEL=DEBUG is not allowed when DJANGO_ENV=production')
+    if SECRET_KEY.startswith('django-insecure-'):
+        raise ImproperlyConfigured('DJANGO_SECRET_KEY must be set when DJANGO_ENV=production')
@@ -16,7 +16,9 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from api_store.views import ProductsViewSet, OrdersViewSet, ProductCollectionsViewSet, ProductReviewsViewSet
+from api_store.metrics import metrics_view
+from api_store.views import ProductsViewSet, OrdersViewSet, ProductCollectionsViewSet, ProductReviewsViewSet, \
+    AnalyticsViewSet
 
 
 router = DefaultRouter()
@@ -24,8 +26,10 @@ router.register('products', ProductsViewSet, basename='products')
 router.register('product-reviews', ProductReviewsViewSet, basename='product-reviews')
 router.register('orders', OrdersViewSet, basename='orders')
 router.register('product-collections', ProductCollectionsViewSet, basename='product-collections')
+router.register('analytics', AnalyticsViewSet, basename='analytics')
 
 urlpatterns = [
                   path('api/v1/', include(router.urls)),
                   path('admin/', admin.site.urls),
+                  path('metrics', metrics_view, name='metrics'),
               ] + router.urls
@@ -0,0 +1,124 @@
+import decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.status import HTTP_200_OK, HTTP_302_FOUND
+from api_store.models import Order, Position
+from api_store.pagination import ApproximateCountPaginator
+
+
+@pytest.mark.django_db
+def test_admin_order_change_page_size(admin_client, order_factory, product_factory):
+    """
+    Тест на то, что страница заказа не выводит весь каталог в select позиций
+    и число запросов не зависит от числа позиций.
+    """
+    products = product_factory(_quantity=30, price=10)
+    order = order_factory()
+    url = reverse('admin:api_store_order_change', args=(order.id,))
+
+    def count_queries(positions_count):
+        Position.objects.filter(order=order).delete()
+        Position.objects.bulk_create(Position(order=order, product=product) for product in products[:positions_count])
+        with CaptureQueriesContext(connection) as queries:
+            resp = admin_client.get(url)
+        assert resp.status_code == HTTP_200_OK
+        return len(queries), resp.content.decode()
+
+    count_queries(1)
+    few_queries, _ = count_queries(2)
+    many_queries, content = count_queries(20)
+
+    assert few_queries == many_queries
+    assert f'<option value="{products[19].id}" selected>' in content
+    assert f'<option value="{products[-1].id}"' not in content
+
+
+@pytest.mark.django_db
+def test_admin_order_total_recalculated(admin_client, order_factory, product_factory, user_factory):
+    """
+    Тест пересчёта суммы заказа на стороне базы после сохранения позиций в админке.
+    """
+    first, second = product_factory(_quantity=2, price=decimal.Decimal('12.50'))
+    order = order_factory(total_amount=0)
+    position = Position.objects.create(order=order, product=first, quantity=2)
+    url = reverse('admin:api_store_order_change', args=(order.id,))
+    payload = {
+        'user': order.user_id,
+        'status': order.status,
+        'positions-TOTAL_FORMS': 2,
+        'positions-INITIAL_FORMS': 1,
+        'positions-MIN_NUM_FORMS': 0,
+        'positions-MAX_NUM_FORMS': 1000,
+        'positions-0-id': position.id,
+        'positions-0-order': order.id,
+        'positions-0-product': first.id,
+        'positions-0-quantity': 2,
+        'positions-1-order': order.id,
+        'positions-1-product': second.id,
+        'positions-1-quantity': 3,
+    }
+
+    resp = admin_client.post(url, payload)
+    order.refresh_from_db()
+
+    assert resp.status_code == HTTP_302_FOUND
+    assert order.total_amount == decimal.Decimal('62.50')
+
+
+@pytest.mark.django_db
+def test_admin_changelists(admin_client, order_factory, product_review_factory, product_collection_factory):
+    """
+    Тест списков и поиска в админке.
+    """
+    orders = order_factory(_quantity=3)
+    review = product_review_factory()
+    product_collection_factory()
+
+    resp_orders = admin_client.get(reverse('admin:api_store_order_changelist'), {'q': orders[0].user.username})
+    resp_order_id = admin_client.get(reverse('admin:api_store_order_changelist'), {'q': str(orders[1].id)})
+    resp_reviews = admin_client.get(reverse('admin:api_store_productreview_changelist'), {'q': str(review.product_id)})
+    resp_products = admin_client.get(reverse('admin:api_store_product_changelist'), {'q': review.product.name})
+    resp_collections = admin_client.get(reverse('admin:api_store_productcollection_changelist'))
+
+    assert [item.id for item in resp_orders.context['cl'].result_list] == [orders[0].id]
+    assert [item.id for item in resp_order_id.context['cl'].result_list] == [orders[1].id]
+    assert [item.id for item in resp_reviews.context['cl'].result_list] == [review.id]
+    assert review.product_id in [item.id for item in resp_products.context['cl'].result_list]
+    assert resp_collections.status_code == HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_approximate_count_paginator(order_factory):
+    """
+    Тест на то, что без оценки планировщика PostgreSQL Paginator считает строки точно.
+    """
+    order_factory(_quantity=3)
+
+    assert ApproximateCountPaginator(Order.objects.all(), 2).count == 3
+
+
+@pytest.mark.django_db
+def test_admin_product_orders_link(admin_client, order_factory, product_factory):
+    """
+    Тест на то, что страница товара ссылается на список заказов с этим товаром,
+    а список фильтруется по товару позиций без повторов заказов.
+    """
+    product, other = product_factory(_quantity=2, price=10)
+    with_product, without_product = order_factory(_quantity=2)
+    Position.objects.bulk_create([
+        Position(order=with_product, product=product, quantity=1),
+        Position(order=with_product, product=other, quantity=1),
+        Position(order=without_product, product=other, quantity=1),
+    ])
+    changelist_url = reverse('admin:api_store_order_changelist')
+
+    resp_product = admin_client.get(reverse('admin:api_store_product_change', args=(product.id,)))
+    resp_orders = admin_client.get(changelist_url, {'positions__product__id__exact': product.id})
+
+    assert resp_product.status_code == HTTP_200_OK
+    assert f'{changelist_url}?positions__product__id__exact={product.id}' in resp_product.content.decode()
+    assert resp_orders.status_code == HTTP_200_OK
+    assert [order.id for order in resp_orders.context['cl'].result_list] == [with_product.id]
@@ -0,0 +1,157 @@
+import datetime
+import decimal
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN
+from api_store.analytics import rebuild_sales_rollups
+from api_store.models import DailyOrderStats, DailyProductSales
+
+
+def get_rollups():
+    """
+    Содержимое витрин без строк, обнулённых приращениями.
+    """
+    return (
+        sorted(DailyOrderStats.objects.exclude(orders_count=0).values_list('day', 'status', 'orders_count', 'revenue')),
+        sorted(
+            DailyProductSales.objects.exclude(orders_count=0)
+            .values_list('day', 'product_id', 'units', 'revenue', 'orders_count')
+        ),
+    )
+
+
+def assert_rollups_consistent():
+    incremental = get_rollups()
+    rebuild_sales_rollups()
+    assert incremental == get_rollups()
+
+
+@pytest.mark.django_db
+def test_sales_rollups_incremental(api_client, product_factory, user_factory):
+    """
+    Тест на то, что витрины после создания, изменения, массовой смены статуса, импорта
+    и удаления заказов совпадают с пересчитанными с нуля.
+    """
+    first, second = product_factory(_quantity=2, price=decimal.Decimal('10.50'))
+    user = user_factory()
+    admin = user_factory(is_staff=True)
+    api_client.force_authenticate(user=user)
+    orders_url = reverse('orders-list')
+
+    created = [
+        api_client.post(orders_url, {'products': [{'product': first.id, 'quantity': 2}]}, format='json').json()['id'],
+        api_client.post(
+            orders_url,
+            {'products': [{'product': first.id, 'quantity': 1}, {'product': second.id, 'quantity': 3}]},
+            format='json',
+        ).json()['id'],
+    ]
+    today = timezone.localdate()
+
+    assert get_rollups() == (
+        [(today, 'NEW', 2, decimal.Decimal('63.00'))],
+        [(today, first.id, 3, decimal.Decimal('31.50'), 2), (today, second.id, 3, decimal.Decimal('31.50'), 1)],
+    )
+    assert_rollups_consistent()
+
+    api_client.put(
+        reverse('orders-detail', args=(created[0],)), {'products': [{'product': second.id, 'quantity': 5}]},
+        format='json',
+    )
+    assert_rollups_consistent()
+
+    api_client.force_authenticate(user=admin)
+    api_client.patch(reverse('orders-detail', args=(created[1],)), {'status': 'IN_PROGRESS'}, format='json')
+    api_client.post(reverse('orders-bulk-status'), {'status': 'DONE', 'ids': created}, format='json')
+    assert_rollups_consistent()
+
+    api_client.force_authenticate(user=user)
+    lines = [{'products': [{'product': first.id, 'quantity': 4}]}, {'products': [{'product': second.id}]}]
+    resp_bulk = api_client.post(
+        reverse('orders-bulk'), '\n'.join(json.dumps(line) for line in lines), content_type='application/x-ndjson',
+    )
+    b''.join(resp_bulk.streaming_content)
+    assert_rollups_consistent()
+
+    api_client.delete(reverse('orders-detail', args=(created[0],)))
+    first.price = 20
+    first.save()
+    call_command('reprice_orders', stdout=StringIO())
+    assert_rollups_consistent()
+    assert get_rollups()[0] == [
+        (today, 'DONE', 1, decimal.Decimal('42.00')),
+        (today, 'NEW', 2, decimal.Decimal('90.50')),
+    ]
+
+
+@pytest.mark.django_db
+def test_rebuild_sales_rollups_command(order_factory, product_factory):
+    """
+    Тест на то, что команда пересчитывает витрины за период и удаляет строки за дни без заказов.
+    """
+    product = product_factory()
+    order = order_factory(total_amount=5)
+    day = timezone.localdate(order.created_at)
+    DailyOrderStats.objects.create(day=day - datetime.timedelta(days=40), status='NEW', orders_count=3, revenue=1)
+    DailyProductSales.objects.create(day=day, product=product, units=7, revenue=1, orders_count=1)
+    out = StringIO()
+
+    call_command('rebuild_sales_rollups', days_batch=7, stdout=out)
+
+    assert 'Записано строк витрин: 1' in out.getvalue()
+    assert list(DailyOrderStats.objects.values_list('day', 'status', 'orders_count', 'revenue')) == [
+        (day, order.status, 1, decimal.Decimal('5.00')),
+    ]
+    assert not DailyProductSales.objects.exists()
+
+
+@pytest.mark.django_db
+def test_analytics_endpoint(api_client, product_factory, user_factory):
+    """
+    Тест отчётов по витринам: итоги, группировки, фильтры по периоду, товару и статусу, права.
+    """
+    first, second = product_factory(_quantity=2)
+    day = datetime.date(2021, 6, 1)
+    next_day = day + datetime.timedelta(days=1)
+    DailyProductSales.objects.bulk_create([
+        DailyProductSales(day=day, product=first, units=2, revenue=decimal.Decimal('20.00'), orders_count=2),
+        DailyProductSales(day=next_day, product=first, units=1, revenue=decimal.Decimal('10.00'), orders_count=1),
+        DailyProductSales(day=next_day, product=second, units=5, revenue=decimal.Decimal('7.50'), orders_count=1),
+    ])
+    DailyOrderStats.objects.bulk_create([
+        DailyOrderStats(day=day, status='NEW', orders_count=2, revenue=decimal.Decimal('20.00')),
+        DailyOrderStats(day=next_day, status='DONE', orders_count=2, revenue=decimal.Decimal('17.50')),
+    ])
+    url = reverse('analytics-list')
+    products_url = reverse('analytics-products')
+    orders_url = reverse('analytics-orders')
+
+    api_client.force_authenticate(user=user_factory())
+    resp_not_admin = api_client.get(url)
+    api_client.force_authenticate(user=user_factory(is_staff=True))
+    resp_summary = api_client.get(url)
+    resp_summary_day = api_client.get(url, {'day_after': '2021-06-02', 'status': 'DONE', 'product': first.id})
+    resp_by_day = api_client.get(products_url)
+    resp_by_product = api_client.get(products_url, {'group_by': 'product', 'product': f'{first.id},{second.id}'})
+    resp_by_status = api_client.get(orders_url, {'group_by': 'status', 'day_before': '2021-06-01'})
+    resp_invalid = api_client.get(orders_url, {'group_by': 'product'})
+
+    assert resp_not_admin.status_code == HTTP_403_FORBIDDEN
+    assert resp_summary.status_code == HTTP_200_OK
+    assert resp_summary.json() == {'orders_count': 4, 'revenue': '37.50', 'units': 8}
+    assert resp_summary_day.json() == {'orders_count': 2, 'revenue': '17.50', 'units': 1}
+    assert resp_by_day.json() == [
+        {'day': '2021-06-01', 'units': 2, 'revenue': '20.00', 'orders_count': 2},
+        {'day': '2021-06-02', 'units': 6, 'revenue': '17.50', 'orders_count': 2},
+    ]
+    assert resp_by_product.json() == [
+        {'product': first.id, 'units': 3, 'revenue': '30.00', 'orders_count': 3},
+        {'product': second.id, 'units': 5, 'revenue': '7.50', 'orders_count': 1},
+    ]
+    assert resp_by_status.json() == [{'status': 'NEW', 'orders_count': 2, 'revenue': '20.00'}]
+    assert resp_invalid.status_code == HTTP_400_BAD_REQUEST
@@ -0,0 +1,85 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.status import HTTP_200_OK, HTTP_401_UNAUTHORIZED
+from api_store.authentication import CachedTokenAuthentication
+
+
+@pytest.fixture
+def token_client(api_client, user_factory):
+    """
+    Клиент с токеном нового пользователя и пустым кэшем аутентификации.
+    """
+    CachedTokenAuthentication.clear()
+    token = Token.objects.create(user=user_factory())
+    api_client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return api_client, token
+
+
+@pytest.mark.django_db
+def test_token_auth_cached(token_client):
+    """
+    Тест на то, что повторный запрос с тем же токеном не обращается к таблице токенов.
+    """
+    api_client, token = token_client
+    url = reverse('orders-list')
+
+    resp_first = api_client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        resp_second = api_client.get(url)
+
+    assert resp_first.status_code == HTTP_200_OK
+    assert resp_second.status_code == HTTP_200_OK
+    assert not any('authtoken_token' in query['sql'] for query in queries.captured_queries)
+    assert CachedTokenAuthentication.stats() == {'hits': 1, 'shared_hits': 0, 'misses': 1}
+
+
+@pytest.mark.django_db
+def test_token_auth_invalidation(token_client):
+    """
+    Тест сброса кэша при деактивации пользователя и удалении токена.
+    """
+    api_client, token = token_client
+    user = token.user
+    url = reverse('orders-list')
+
+    api_client.get(url)
+    user.is_active = False
+    user.save()
+    resp_inactive = api_client.get(url)
+    user.is_active = True
+    user.save()
+    resp_active = api_client.get(url)
+    token.delete()
+    resp_deleted = api_client.get(url)
+
+    assert resp_inactive.status_code == HTTP_401_UNAUTHORIZED
+    assert resp_active.status_code == HTTP_200_OK
+    assert resp_deleted.status_code == HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_token_auth_shared_cache_invalidation(token_client, settings):
+    """
+    Тест на то, что с общим кэшем сброс записи другим процессом сразу действует и в текущем.
+    """
+    settings.TOKEN_AUTH_CACHE = {**settings.TOKEN_AUTH_CACHE, 'CACHE_ALIAS': 'default'}
+    caches['default'].clear()
+    api_client, token = token_client
+    url = reverse('orders-list')
+
+    resp_first = api_client.get(url)
+    resp_cached = api_client.get(url)
+    # Другой воркер деактивировал пользователя и сбросил запись в общем кэше.
+    get_user_model().objects.filter(pk=token.user_id).update(is_active=False)
+    caches['default'].delete(CachedTokenAuthentication.get_shared_key(token.key))
+    resp_inactive = api_client.get(url)
+
+    assert resp_first.status_code == HTTP_200_OK
+    assert resp_cached.status_code == HTTP_200_OK
+    assert resp_inactive.status_code == HTTP_401_UNAUTHORIZED
+    assert CachedTokenAuthentication.stats() == {'hits': 0, 'shared_hits': 1, 'misses': 2}
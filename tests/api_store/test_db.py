@@ -0,0 +1,22 @@
+import pytest
+from django.db import connection
+from api_store.db import check_connections_health
+
+
+@pytest.mark.django_db(transaction=True)
+def test_check_connections_health_closes_broken_connection(monkeypatch):
+    """
+    Тест проверки постоянных соединений: неработающее соединение закрывается, рабочее - нет.
+    """
+    closed = []
+    connection.ensure_connection()
+    monkeypatch.setitem(connection.settings_dict, 'CONN_HEALTH_CHECKS', True)
+    monkeypatch.setattr(connection, 'close', lambda: closed.append(True))
+
+    check_connections_health()
+    closed_when_usable = len(closed)
+    monkeypatch.setattr(connection, 'is_usable', lambda: False)
+    check_connections_health()
+
+    assert closed_when_usable == 0
+    assert closed == [True]
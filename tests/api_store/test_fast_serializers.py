@@ -0,0 +1,50 @@
+import pytest
+from rest_framework.renderers import JSONRenderer
+from api_store.fast_serializers import FastOrderSerializer, FastProductSerializer
+from api_store.models import Order, Position, Product
+from api_store.serializers import OrderSerializer, ProductSerializer
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+@pytest.mark.django_db
+def test_fast_product_serializer_parity(product_factory, product_review_factory):
+    """
+    Тест на совпадение вывода быстрого и обычного сериализатора товаров байт в байт.
+    """
+    products = product_factory(_quantity=5)
+    product_review_factory(product=products[0], rating=4)
+    product_factory(price='0.50', description='')
+    queryset = Product.objects.all()
+
+    assert render(FastProductSerializer(queryset).data) == render(ProductSerializer(queryset, many=True).data)
+
+
+@pytest.mark.django_db
+def test_fast_order_serializer_parity(order_factory, product_factory, user_factory):
+    """
+    Тест на совпадение вывода быстрого и обычного сериализатора заказов байт в байт,
+    включая вложенные позиции и пользователя.
+    """
+    products = product_factory(_quantity=3)
+    orders = order_factory(_quantity=4, user=user_factory(first_name='Иван'))
+    order_factory(total_amount=None)
+    for order in orders[:3]:
+        for quantity, product in enumerate(products, start=1):
+            Position.objects.create(order=order, product=product, quantity=quantity)
+    queryset = Order.objects.all().prefetch_related('positions').select_related('user')
+
+    assert render(FastOrderSerializer(queryset).data) == render(OrderSerializer(queryset, many=True).data)
+
+
+@pytest.mark.django_db
+def test_fast_order_serializer_query_count(order_factory, django_assert_num_queries):
+    """
+    Тест на постоянное число запросов быстрого сериализатора заказов.
+    """
+    order_factory(_quantity=10)
+
+    with django_assert_num_queries(3):
+        FastOrderSerializer(Order.objects.all()).data
@@ -0,0 +1,87 @@
+import decimal
+import random
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from api_store.filters import OrderFilter, ProductFilter, ProductReviewFilter
+from api_store.models import Order, OrderStatusChoices, Product, ProductReview
+
+
+@pytest.fixture
+def seeded_store(db):
+    """
+    Фикстура с набором данных, на котором выбор индекса планировщиком показателен.
+    """
+    rnd = random.Random(0)
+    User.objects.bulk_create(User(username=f'user_{number}') for number in range(20))
+    Product.objects.bulk_create(
+        Product(name=f'product {number}', description='description', price=decimal.Decimal(rnd.randrange(100, 100000)))
+        for number in range(500)
+    )
+    users = list(User.objects.order_by('id'))
+    products = list(Product.objects.order_by('id'))
+    statuses = [OrderStatusChoices.DONE] * 8 + [OrderStatusChoices.NEW, OrderStatusChoices.IN_PROGRESS]
+    Order.objects.bulk_create(
+        Order(user=rnd.choice(users), status=rnd.choice(statuses), total_amount=rnd.randrange(100, 1000000))
+        for _ in range(2000)
+    )
+    ProductReview.objects.bulk_create(
+        ProductReview(user=user, product=product, text='text', rating=rnd.randint(1, 5))
+        for user in users for product in rnd.sample(products, 50)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+        if connection.vendor == 'postgresql':
+            # На маленькой таблице PostgreSQL выбрал бы Seq Scan; проверяем, что индекс применим.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+    return users, products
+
+
+def assert_index_scan(queryset, *index_names):
+    plan = queryset.explain()
+    assert any(index_name in plan for index_name in index_names), plan
+
+
+@pytest.mark.parametrize(
+    ['params', 'index_names'],
+    (
+            ({'status': 'NEW'}, ('order_status_idx', 'order_open_idx')),
+            ({'total_amount_from': 1000, 'total_amount_to': 2000}, ('order_total_amount_idx',)),
+            ({'created_at_after': '2021-06-01', 'created_at_before': '2021-06-02'}, ('order_created_at_idx',)),
+            ({'updated_at_after': '2021-06-01', 'updated_at_before': '2021-06-02'}, ('order_keyset_idx',)),
+    )
+)
+def test_order_filter_indexes(seeded_store, params, index_names):
+    """
+    Тест на использование индексов фильтрами заказов (админская выборка).
+    """
+    assert_index_scan(OrderFilter(params, queryset=Order.objects.all()).qs, *index_names)
+
+
+def test_order_user_list_index(seeded_store):
+    """
+    Тест на использование индекса (user_id, updated_at) для списка заказов пользователя.
+    """
+    users, _ = seeded_store
+
+    assert_index_scan(Order.objects.filter(user=users[0]), 'order_user_keyset_idx')
+
+
+def test_product_filter_price_index(seeded_store):
+    """
+    Тест на использование индекса цены фильтром товаров.
+    """
+    queryset = ProductFilter({'min_price': 1000, 'max_price': 1500}, queryset=Product.objects.all()).qs
+
+    assert_index_scan(queryset, 'product_price_idx')
+
+
+def test_product_review_filter_index(seeded_store):
+    """
+    Тест на использование индекса (product_id, created_at) фильтром отзывов.
+    """
+    _, products = seeded_store
+    params = {'product_id': products[0].id, 'created_at_after': '2021-06-01'}
+    queryset = ProductReviewFilter(params, queryset=ProductReview.objects.all()).qs
+
+    assert_index_scan(queryset, 'review_product_created_idx')
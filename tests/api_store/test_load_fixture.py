@@ -0,0 +1,57 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from rest_framework.authtoken.models import Token
+from api_store.fixture_loader import iter_json_array
+from api_store.models import Order, Position, Product, ProductCollection, ProductReview
+
+
+def test_iter_json_array_chunks():
+    """
+    Тест на то, что потоковый разбор даёт те же объекты, что json.load, при любых границах кусков.
+    """
+    with open('fixtures.json', encoding='utf-8') as fixture:
+        expected = json.load(fixture)
+    with open('fixtures.json', encoding='utf-8') as fixture:
+        content = fixture.read()
+
+    assert list(iter_json_array(StringIO(content), chunk_size=7)) == expected
+    assert list(iter_json_array(StringIO(' [ ] '))) == []
+    with pytest.raises(ValueError):
+        list(iter_json_array(StringIO('[{"model": "api_store.product"')))
+
+
+@pytest.mark.django_db
+def test_load_fixture():
+    """
+    Тест на то, что load_fixture загружает fixtures.json с датами, M2M, агрегатами отзывов и сброшенными id.
+    """
+    call_command('load_fixture', 'fixtures.json', batch_size=2, stdout=StringIO())
+    product = Product.objects.get(pk=5)
+    collection = ProductCollection.objects.get(pk=3)
+    order = Order.objects.create(user_id=5)
+    reviewed = Product.objects.get(pk=ProductReview.objects.values('product_id')[:1])
+
+    assert Product.objects.count() == 10
+    assert Position.objects.count() == 8
+    assert Token.objects.filter(key='414cb154831946cf0e059d4cb493d911b2ea2a60', user_id=5).exists()
+    assert product.updated_at.isoformat().startswith('2021-06-20T17:35:25')
+    assert set(collection.products.values_list('id', flat=True)) == {5, 6, 7, 8, 9}
+    assert reviewed.reviews_count > 0
+    assert order.pk > 36
+
+
+@pytest.mark.django_db
+def test_load_fixture_conflict(product_factory):
+    """
+    Тест на то, что загрузка поверх существующих id откатывается целиком.
+    """
+    product_factory(id=5)
+
+    with pytest.raises(CommandError):
+        call_command('load_fixture', 'fixtures.json', stdout=StringIO())
+
+    assert Product.objects.count() == 1
+    assert not Order.objects.exists()
@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+
+import pytest
+from django.urls import reverse
+from rest_framework.status import HTTP_200_OK, HTTP_403_FORBIDDEN
+from api_store.metrics import registry
+
+
+@pytest.fixture
+def metrics_registry():
+    """
+    Фикстура пустого реестра метрик.
+    """
+    registry.clear()
+    yield registry
+    registry.clear()
+
+
+@pytest.mark.django_db
+def test_metrics_per_endpoint(api_client, product_factory, metrics_registry):
+    """
+    Тест на то, что /metrics отдаёт число запросов, время, SQL-запросы и размер ответа по маршрутам.
+    """
+    product = product_factory()
+    api_client.get(reverse('products-list'))
+    api_client.get(reverse('products-list'))
+    api_client.get(reverse('products-detail', args=[product.id]))
+
+    resp = api_client.get(reverse('metrics'))
+    body = resp.content.decode()
+
+    assert resp.status_code == HTTP_200_OK
+    assert resp['Content-Type'].startswith('text/plain; version=0.0.4')
+    assert 'api_requests_total{endpoint="products-list",method="GET",status="200"} 2' in body
+    assert 'api_requests_total{endpoint="products-detail",method="GET",status="200"} 1' in body
+    assert 'api_request_duration_seconds_bucket{endpoint="products-list",method="GET",le="+Inf"} 2' in body
+    assert 'api_db_queries_count{endpoint="products-list",method="GET"} 2' in body
+    assert 'api_response_bytes_total{endpoint="products-list",method="GET"}' in body
+    assert 'endpoint="metrics"' not in body
+
+
+@pytest.mark.django_db
+def test_metrics_multiprocess(api_client, metrics_registry, settings, tmp_path):
+    """
+    Тест на то, что /metrics суммирует снимки всех процессов из METRICS['DIRECTORY'].
+    """
+    settings.METRICS = {'DIRECTORY': str(tmp_path), 'FLUSH_INTERVAL': 0}
+    labels = [['endpoint', 'orders-list'], ['method', 'GET']]
+    other_worker = {
+        'counters': [['api_requests_total', labels + [['status', '401']], 3]],
+        'histograms': [['api_db_queries', labels, [3, 0, 0, 0, 0, 0, 0, 0], 0, 3]],
+    }
+    (tmp_path / '1.json').write_text(json.dumps(other_worker))
+
+    api_client.get(reverse('orders-list'))
+    body = api_client.get(reverse('metrics')).content.decode()
+
+    assert 'api_requests_total{endpoint="orders-list",method="GET",status="401"} 4' in body
+    assert 'api_db_queries_count{endpoint="orders-list",method="GET"} 4' in body
+    assert 'api_db_queries_bucket{endpoint="orders-list",method="GET",le="0"} 4' in body
+
+
+@pytest.mark.django_db
+def test_metrics_flush_concurrent(metrics_registry, settings, tmp_path):
+    """
+    Тест на то, что параллельная запись снимков из потоков не теряет файл и не оставляет временных файлов.
+    """
+    settings.METRICS = {'DIRECTORY': str(tmp_path), 'FLUSH_INTERVAL': 0}
+    errors = []
+
+    def observe():
+        try:
+            for _ in range(20):
+                metrics_registry.observe_request('products-list', 'GET', 200, 0.01, 1, 0.001, 10)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=observe) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    metrics_registry.flush(force=True)
+
+    assert errors == []
+    assert [path.name for path in tmp_path.iterdir()] == [f'{os.getpid()}.json']
+    snapshot = json.loads((tmp_path / f'{os.getpid()}.json').read_text())
+    assert ['api_requests_total', [['endpoint', 'products-list'], ['method', 'GET'], ['status', '200']], 160] in (
+        snapshot['counters']
+    )
+
+
+@pytest.mark.django_db
+def test_metrics_flush_error(api_client, metrics_registry, settings, tmp_path):
+    """
+    Тест на то, что ошибка записи снимка метрик не ломает запрос.
+    """
+    directory = tmp_path / 'metrics'
+    directory.write_text('')
+    settings.METRICS = {'DIRECTORY': str(directory), 'FLUSH_INTERVAL': 0}
+
+    resp = api_client.get(reverse('products-list'))
+
+    assert resp.status_code == HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_metrics_streaming_response(api_client, product_factory, metrics_registry):
+    """
+    Тест на то, что потоковая выгрузка учитывается после чтения тела: SQL-запросы
+    при чтении и размер тела попадают в метрики.
+    """
+    product_factory(_quantity=3)
+
+    resp = api_client.get(reverse('products-list'), {'format': 'ndjson'})
+    counters_before = metrics_registry.snapshot()['counters']
+    content = b''.join(resp.streaming_content)
+    snapshot = metrics_registry.snapshot()
+    counters = {name: value for name, labels, value in snapshot['counters'] if labels[0] == ('endpoint', 'products-list')}
+    queries = [histogram for histogram in snapshot['histograms'] if histogram[0] == 'api_db_queries']
+
+    assert not [counter for counter in counters_before if counter[0] == 'api_requests_total']
+    assert counters['api_requests_total'] == 1
+    assert counters['api_response_bytes_total'] == len(content) > 0
+    assert len(queries) == 1 and queries[0][3] > 0 and queries[0][4] == 1
+
+
+@pytest.mark.django_db
+def test_metrics_access(api_client, client, user_factory, metrics_registry, settings):
+    """
+    Тест на то, что /metrics недоступен анонимному клиенту с чужого адреса,
+    но доступен из разрешённой сети и staff-пользователю.
+    """
+    url = reverse('metrics')
+
+    resp_anonymous = api_client.get(url, REMOTE_ADDR='203.0.113.5')
+    resp_invalid_address = api_client.get(url, REMOTE_ADDR='')
+    client.force_login(user_factory(is_staff=True))
+    resp_staff = client.get(url, REMOTE_ADDR='203.0.113.5')
+    settings.METRICS = {'ALLOWED_IPS': ['203.0.113.0/24']}
+    resp_allowed_network = api_client.get(url, REMOTE_ADDR='203.0.113.5')
+
+    assert resp_anonymous.status_code == HTTP_403_FORBIDDEN
+    assert resp_invalid_address.status_code == HTTP_403_FORBIDDEN
+    assert resp_staff.status_code == HTTP_200_OK
+    assert resp_allowed_network.status_code == HTTP_200_OK
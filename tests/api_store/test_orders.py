@@ -1,9 +1,18 @@
 import pytest
+from django.apps import apps as django_apps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
 from django.urls import reverse
 import decimal
+import json
 import random
-from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN, \
-    HTTP_400_BAD_REQUEST
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_401_UNAUTHORIZED, \
+    HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
+from api_store.models import Order, Position
 
 
 @pytest.mark.django_db
@@ -39,7 +48,7 @@ def test_order_create(api_client, product_factory, user_factory):
 def test_order_detail(api_client, product_factory, order_factory, user_factory):
     """Тест на получение одного конкретного курса:
     - неавторизованный пользователь - отказ в просмотре.
-    - пользователь видит только свой заказ,
+    - пользователь видит только свой заказ, чужой для него не существует,
     - админ видит все заказы."""
 
     order = order_factory()
@@ -60,7 +69,7 @@ def test_order_detail(api_client, product_factory, order_factory, user_factory):
     assert resp_not_authenticated.status_code == HTTP_401_UNAUTHORIZED
     assert resp_owner.status_code == HTTP_200_OK
     assert resp_owner.json()['id'] == order.id
-    assert resp_not_owner.status_code == HTTP_403_FORBIDDEN
+    assert resp_not_owner.status_code == HTTP_404_NOT_FOUND
     assert resp_admin.status_code == HTTP_200_OK
     assert resp_admin.json()['id'] == order.id
 
@@ -100,7 +109,7 @@ def test_order_list(api_client, order_factory, user_factory):
 def test_order_update(api_client, product_factory, order_factory, user_factory):
     """Тест на изменение позиций заказа:
     - неавторизованный пользователь - отказ,
-    - пользователь может менять только свой заказ,
+    - пользователь может менять только свой заказ, чужой для него не существует,
     - админ может менять все заказы."""
 
     order = order_factory()
@@ -129,8 +138,9 @@ def test_order_update(api_client, product_factory, order_factory, user_factory):
 
     assert resp_not_authenticated.status_code == HTTP_401_UNAUTHORIZED
     assert resp_owner.status_code == HTTP_200_OK
-    assert resp_not_owner.status_code == HTTP_403_FORBIDDEN
+    assert resp_not_owner.status_code == HTTP_404_NOT_FOUND
     assert resp_admin.status_code == HTTP_200_OK
+    assert decimal.Decimal(resp_admin.json()['total_amount']) == new_product.price * 5
 
 
 @pytest.mark.django_db
@@ -206,3 +216,238 @@ def test_order_filter_total(api_client, order_factory, user_factory):
     assert result_set_from == expected_set_from
     assert resp_to.status_code == HTTP_200_OK
     assert result_set_to == expected_set_to
+
+
+@pytest.mark.django_db
+def test_order_create_query_count(api_client, product_factory, user_factory):
+    """
+    Тест на то, что число запросов при создании заказа не зависит от количества позиций.
+    """
+    products = product_factory(_quantity=20, price=100)
+    test_user = user_factory()
+    api_client.force_authenticate(user=test_user)
+    url = reverse('orders-list')
+
+    def create_order(positions_count):
+        payload = {
+            "products": [{"product": product.id, "quantity": 1} for product in products[:positions_count]]
+        }
+        with CaptureQueriesContext(connection) as queries:
+            resp = api_client.post(url, payload, format='json')
+        assert resp.status_code == HTTP_201_CREATED
+        return len(queries)
+
+    assert create_order(2) == create_order(20)
+
+
+@pytest.mark.django_db
+def test_order_create_unknown_product(api_client, product_factory, user_factory):
+    """
+    Тест на отказ в создании заказа с несуществующим товаром.
+    """
+    product = product_factory()
+    api_client.force_authenticate(user=user_factory())
+    url = reverse('orders-list')
+    payload = {
+        "products": [
+            {"product": product.id, "quantity": 1},
+            {"product": product.id + 1000, "quantity": 1}
+        ]
+    }
+
+    resp = api_client.post(url, payload, format='json')
+
+    assert resp.status_code == HTTP_400_BAD_REQUEST
+    assert Order.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_order_bulk_import(api_client, product_factory, user_factory):
+    """
+    Тест на пакетный импорт заказов из NDJSON с построчными результатами.
+    """
+    products = product_factory(_quantity=2)
+    lines = [
+        {"products": [{"product": products[0].id, "quantity": 2}]},
+        {"products": [{"product": products[0].id, "quantity": 1}, {"product": products[1].id, "quantity": 3}]},
+        {"products": [{"product": products[1].id + 1000, "quantity": 1}]},
+    ]
+    body = '\n'.join(json.dumps(line) for line in lines) + '\n\nnot json\n'
+    test_user = user_factory()
+    url = reverse('orders-bulk')
+
+    resp_not_authenticated = api_client.post(url, body, content_type='application/x-ndjson')
+    api_client.force_authenticate(user=test_user)
+    resp = api_client.post(url, body, content_type='application/x-ndjson')
+    results = [json.loads(line) for line in b''.join(resp.streaming_content).splitlines()]
+    created_orders = Order.objects.filter(user=test_user)
+
+    assert resp_not_authenticated.status_code == HTTP_401_UNAUTHORIZED
+    assert resp.status_code == HTTP_200_OK
+    assert [result['line'] for result in results] == [1, 2, 3, 5]
+    assert {result['id'] for result in results if 'id' in result} == {order.id for order in created_orders}
+    assert 'errors' in results[2] and 'errors' in results[3]
+    assert sorted(order.total_amount for order in created_orders) == sorted([
+        products[0].price * 2,
+        products[0].price + products[1].price * 3,
+    ])
+
+
+@pytest.mark.django_db
+def test_order_export_ndjson(api_client, order_factory, user_factory):
+    """
+    Тест потоковой выгрузки заказов в NDJSON с учётом фильтров и прав пользователя.
+    """
+    test_user = user_factory()
+    own_done = order_factory(_quantity=3, user=test_user, status='DONE')
+    order_factory(_quantity=2, user=test_user, status='NEW')
+    order_factory(_quantity=4, status='DONE')
+    api_client.force_authenticate(user=test_user)
+    url = reverse('orders-list')
+
+    resp = api_client.get(url, {'format': 'ndjson', 'status': 'DONE'})
+    rows = [json.loads(line) for line in b''.join(resp.streaming_content).splitlines()]
+
+    assert resp.status_code == HTTP_200_OK
+    assert resp['Content-Type'].startswith('application/x-ndjson')
+    assert {row['id'] for row in rows} == {order.id for order in own_done}
+    assert all(row['user']['id'] == test_user.id for row in rows)
+
+
+@pytest.mark.django_db
+def test_order_read_query_count(api_client, order_factory, product_factory, user_factory):
+    """
+    Тест на то, что число запросов при чтении заказов не зависит от количества заказов и позиций.
+    """
+    test_user = user_factory()
+    products = product_factory(_quantity=3, price=100)
+    api_client.force_authenticate(user=test_user)
+    url = reverse('orders-list')
+
+    def count_queries(params):
+        with CaptureQueriesContext(connection) as queries:
+            resp = api_client.get(url, params)
+        assert resp.status_code == HTTP_200_OK
+        return len(queries)
+
+    def add_orders(quantity):
+        for order in order_factory(_quantity=quantity, user=test_user):
+            Position.objects.bulk_create(Position(order=order, product=product) for product in products)
+
+    add_orders(2)
+    few_list, few_page = count_queries({}), count_queries({'page_size': 50})
+    add_orders(10)
+    many_list, many_page = count_queries({}), count_queries({'page_size': 50})
+    order = Order.objects.filter(user=test_user).first()
+    with CaptureQueriesContext(connection) as detail_queries:
+        api_client.get(reverse('orders-detail', args=(order.id,)))
+
+    assert few_list == many_list
+    assert few_page == many_page
+    assert len(detail_queries) == 2
+
+
+@pytest.mark.django_db
+def test_reprice_orders(order_factory, product_factory):
+    """
+    Тест пересчёта сумм открытых заказов по текущим ценам: закрытые заказы
+    и заказы с неизменной суммой не обновляются.
+    """
+    product = product_factory(price=10)
+    new_order, done_order, empty_order = order_factory(_quantity=3, total_amount=20)
+    done_order.status = 'DONE'
+    done_order.save()
+    empty_order.total_amount = 0
+    empty_order.save()
+    for order in (new_order, done_order):
+        Position.objects.create(order=order, product=product, quantity=2)
+    product.price = 15
+    product.save()
+    out = StringIO()
+
+    call_command('reprice_orders', batch_size=1, stdout=out)
+    updated_at = Order.objects.get(pk=new_order.pk).updated_at
+    call_command('reprice_orders', stdout=StringIO())
+
+    assert 'Обновлено заказов: 1' in out.getvalue()
+    assert Order.objects.get(pk=new_order.pk).total_amount == decimal.Decimal('30.00')
+    assert Order.objects.get(pk=new_order.pk).updated_at == updated_at
+    assert Order.objects.get(pk=done_order.pk).total_amount == decimal.Decimal('20.00')
+    assert Order.objects.get(pk=empty_order.pk).total_amount == decimal.Decimal('0.00')
+
+
+@pytest.mark.django_db
+def test_order_position_price_snapshot(api_client, product_factory, user_factory):
+    """
+    Тест на то, что позиции хранят цену на момент заказа и не меняются вместе с ценой товара.
+    """
+    product = product_factory(price=decimal.Decimal('12.50'))
+    api_client.force_authenticate(user=user_factory())
+    resp_create = api_client.post(
+        reverse('orders-list'), {'products': [{'product': product.id, 'quantity': 3}]}, format='json',
+    )
+    product.price = 100
+    product.save()
+    resp_detail = api_client.get(reverse('orders-detail', args=(resp_create.json()['id'],)))
+
+    assert resp_create.json()['products'][0]['unit_price'] == '12.50'
+    assert resp_detail.json()['products'][0]['unit_price'] == '12.50'
+    assert resp_detail.json()['products'][0]['total_price'] == '37.50'
+    assert resp_detail.json()['total_amount'] == '37.50'
+
+
+@pytest.mark.django_db
+def test_position_prices_backfill(order_factory, product_factory, monkeypatch):
+    """
+    Тест на то, что миграция заполняет цены позиций пакетами и не трогает уже заполненные.
+    """
+    migration = import_module('api_store.migrations.0006_position_prices')
+    monkeypatch.setattr(migration, 'BACKFILL_BATCH_SIZE', 2)
+    product = product_factory(price=10)
+    order = order_factory()
+    kept = Position.objects.create(order=order, product=product_factory(price=5), quantity=2)
+    Position.objects.bulk_create(Position(order=order, product=product, quantity=quantity) for quantity in (1, 2, 3))
+
+    migration.fill_position_prices(django_apps, SimpleNamespace(connection=connection))
+
+    assert list(Position.objects.order_by('id').values_list('unit_price', 'total_price')) == [
+        (decimal.Decimal('5.00'), decimal.Decimal('10.00')),
+        (decimal.Decimal('10.00'), decimal.Decimal('10.00')),
+        (decimal.Decimal('10.00'), decimal.Decimal('20.00')),
+        (decimal.Decimal('10.00'), decimal.Decimal('30.00')),
+    ]
+    assert Position.objects.get(pk=kept.pk).unit_price == decimal.Decimal('5.00')
+
+
+@pytest.mark.django_db
+def test_order_bulk_status(api_client, order_factory, user_factory):
+    """
+    Тест массовой смены статуса заказов админом: по ids и по фильтру, одним UPDATE,
+    только допустимые переходы, со сдвигом updated_at.
+    """
+    new_orders = order_factory(_quantity=3, status='NEW')
+    done_order = order_factory(status='DONE')
+    url = reverse('orders-bulk-status')
+    payload = {'status': 'IN_PROGRESS', 'ids': [order.id for order in new_orders[:2]] + [done_order.id]}
+    updated_at = Order.objects.get(pk=new_orders[0].pk).updated_at
+
+    api_client.force_authenticate(user=new_orders[0].user)
+    resp_not_admin = api_client.post(url, payload, format='json')
+    api_client.force_authenticate(user=user_factory(is_staff=True))
+    with CaptureQueriesContext(connection) as queries:
+        resp_ids = api_client.post(url, payload, format='json')
+    update_queries = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+    resp_filter = api_client.post(f'{url}?status=IN_PROGRESS', {'status': 'DONE'}, format='json')
+    resp_no_filter = api_client.post(url, {'status': 'DONE'}, format='json')
+    resp_not_allowed = api_client.post(url, {'status': 'NEW', 'ids': [done_order.id]}, format='json')
+
+    assert resp_not_admin.status_code == HTTP_403_FORBIDDEN
+    assert resp_ids.status_code == HTTP_200_OK and resp_ids.json() == {'updated': 2}
+    assert len(update_queries) == 1
+    assert resp_filter.json() == {'updated': 2}
+    assert resp_no_filter.status_code == HTTP_400_BAD_REQUEST
+    assert resp_not_allowed.status_code == HTTP_400_BAD_REQUEST
+    assert dict(Order.objects.values_list('id', 'status')) == {
+        new_orders[0].id: 'DONE', new_orders[1].id: 'DONE', new_orders[2].id: 'NEW', done_order.id: 'DONE',
+    }
+    assert Order.objects.get(pk=new_orders[0].pk).updated_at > updated_at
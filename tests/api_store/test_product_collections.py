@@ -2,7 +2,10 @@ import pytest
 from django.urls import reverse
 from django.contrib.auth.models import User
 import random
-from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_403_FORBIDDEN, HTTP_204_NO_CONTENT
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_403_FORBIDDEN, HTTP_204_NO_CONTENT, \
+    HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED
 
 from api_store.models import ProductCollection
 
@@ -126,3 +129,107 @@ def test_product_collection_delete(api_client, product_collection_factory, user_
     resp = api_client.delete(url, format='json')
 
     assert resp.status_code == expected_status
+
+
+@pytest.mark.django_db
+def test_product_collection_response_cache_invalidation(api_client, product_collection_factory, product_factory):
+    """
+    Тест сброса кэша ответов подборок при изменении состава товаров и самих товаров.
+    """
+    collection = product_collection_factory()
+    product = product_factory(price=100)
+    url = reverse('product-collections-list')
+
+    resp_empty = api_client.get(url)
+    collection.products.add(product)
+    resp_added = api_client.get(url)
+    product.price = 200
+    product.save()
+    resp_product_changed = api_client.get(url)
+
+    assert resp_empty.json()[0]['products'] == []
+    assert [item['id'] for item in resp_added.json()[0]['products']] == [product.id]
+    assert resp_product_changed.json()[0]['products'][0]['price'] == '200.00'
+
+
+@pytest.mark.django_db
+def test_product_collection_update_diff(api_client, product_collection_factory, product_factory):
+    """
+    Тест на то, что обновление подборки проверяет товары одним запросом и меняет только разницу состава.
+    """
+    kept, removed, added = product_factory(_quantity=3)
+    collection = product_collection_factory()
+    collection.products.add(kept, removed)
+    through = ProductCollection.products.through
+    kept_link_id = through.objects.get(productcollection=collection, product=kept).id
+    admin = User.objects.create_user('admin', is_staff=True)
+    api_client.force_authenticate(user=admin)
+    url = reverse('product-collections-detail', args=(collection.id,))
+    payload = {'title': 'title', 'text': 'text', 'products': [{'product_id': kept.id}, {'product_id': added.id}]}
+
+    with CaptureQueriesContext(connection) as queries:
+        resp = api_client.put(url, payload, format='json')
+    product_id_queries = [
+        query for query in queries.captured_queries
+        if query['sql'].startswith('SELECT') and 'FROM "api_store_product" WHERE "api_store_product"."id" IN' in query['sql']
+    ]
+    resp_unknown = api_client.put(url, {**payload, 'products': [{'product_id': added.id + 100}]}, format='json')
+
+    assert resp.status_code == HTTP_200_OK
+    assert {item['id'] for item in resp.json()['products']} == {kept.id, added.id}
+    assert through.objects.get(productcollection=collection, product=kept).id == kept_link_id
+    assert len(product_id_queries) == 1
+    assert resp_unknown.status_code == HTTP_400_BAD_REQUEST
+    assert resp_unknown.json() == {'non_field_errors': [f'Товар с ID {added.id + 100} не существует']}
+
+
+@pytest.mark.django_db
+def test_product_collection_add_remove_products(api_client, product_collection_factory, product_factory):
+    """
+    Тест добавления и удаления отдельных товаров подборки со сбросом кэша ответа.
+    """
+    first, second, third = product_factory(_quantity=3)
+    collection = product_collection_factory()
+    collection.products.add(first)
+    detail_url = reverse('product-collections-detail', args=(collection.id,))
+    add_url = reverse('product-collections-add-products', args=(collection.id,))
+    remove_url = reverse('product-collections-remove-products', args=(collection.id,))
+    resp_cached = api_client.get(detail_url)
+    resp_forbidden = api_client.post(add_url, {'products': [{'product_id': second.id}]}, format='json')
+    api_client.force_authenticate(user=User.objects.create_user('admin', is_staff=True))
+
+    resp_add = api_client.post(
+        add_url, {'products': [{'product_id': first.id}, {'product_id': second.id}, {'product_id': third.id}]},
+        format='json',
+    )
+    resp_remove = api_client.post(remove_url, {'products': [{'product_id': first.id}]}, format='json')
+    resp_invalid = api_client.post(remove_url, {'products': [first.id]}, format='json')
+    api_client.force_authenticate(user=None)
+    resp_detail = api_client.get(detail_url)
+
+    assert [item['id'] for item in resp_cached.json()['products']] == [first.id]
+    assert resp_forbidden.status_code in (HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN)
+    assert resp_add.json() == {'added': sorted([second.id, third.id])}
+    assert resp_remove.json() == {'removed': [first.id]}
+    assert resp_invalid.status_code == HTTP_400_BAD_REQUEST
+    assert {item['id'] for item in resp_detail.json()['products']} == {second.id, third.id}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('body', [[{'product_id': 1}], 5, {}, {'products': None}, None])
+def test_product_collection_add_remove_products_invalid_body(api_client, product_collection_factory, body):
+    """
+    Тест на то, что тело add-products / remove-products не в виде {"products": [...]}
+    (список, число, пустое тело, без products) даёт 400, а не 500.
+    """
+    collection = product_collection_factory()
+    api_client.force_authenticate(user=User.objects.create_user('admin', is_staff=True))
+
+    for url_name in ('product-collections-add-products', 'product-collections-remove-products'):
+        url = reverse(url_name, args=(collection.id,))
+        if body is None:
+            resp = api_client.post(url)
+        else:
+            resp = api_client.post(url, body, format='json')
+
+        assert resp.status_code == HTTP_400_BAD_REQUEST
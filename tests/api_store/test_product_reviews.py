@@ -1,9 +1,16 @@
+import decimal
+
 import pytest
 from django.urls import reverse
 import random
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN, \
     HTTP_400_BAD_REQUEST, HTTP_204_NO_CONTENT
 
+from api_store.models import Product, ProductReview
+from api_store.ratings import rebuild_product_ratings
+
 
 @pytest.mark.django_db
 def test_product_review_create(api_client, product_factory, user_factory):
@@ -123,3 +130,120 @@ def test_product_review_filter_product(api_client, product_review_factory):
 
     assert resp.status_code == HTTP_200_OK
     assert result_ids_set == expected_ids_set
+
+
+@pytest.mark.django_db
+def test_product_review_rating_aggregates(api_client, product_factory, user_factory):
+    """
+    Тест пересчёта средней оценки и количества отзывов товара при создании,
+    изменении и удалении отзывов.
+    """
+    product = product_factory()
+    first_user, second_user = user_factory(_quantity=2)
+    url = reverse('product-reviews-list')
+    product_url = reverse('products-detail', args=(product.id,))
+
+    api_client.force_authenticate(user=first_user)
+    first_review = api_client.post(url, {'product_id': product.id, 'text': 'text', 'rating': 5}, format='json')
+    api_client.force_authenticate(user=second_user)
+    api_client.post(url, {'product_id': product.id, 'text': 'text', 'rating': 2}, format='json')
+    after_create = api_client.get(product_url).json()
+    api_client.force_authenticate(user=first_user)
+    review_url = reverse('product-reviews-detail', args=(first_review.json()['id'],))
+    api_client.put(review_url, {'product_id': product.id, 'text': 'text', 'rating': 4}, format='json')
+    after_update = api_client.get(product_url).json()
+    api_client.delete(review_url)
+    after_delete = api_client.get(product_url).json()
+
+    assert (after_create['reviews_count'], after_create['rating_avg']) == (2, '3.50')
+    assert (after_update['reviews_count'], after_update['rating_avg']) == (2, '3.00')
+    assert (after_delete['reviews_count'], after_delete['rating_avg']) == (1, '2.00')
+
+
+def get_rating_aggregates():
+    return list(Product.objects.order_by('id').values_list('id', 'rating_sum', 'reviews_count', 'rating_avg'))
+
+
+@pytest.mark.django_db
+def test_product_review_rating_deltas(product_factory, user_factory, product_review_factory):
+    """
+    Тест на то, что агрегаты товаров меняются приращениями без чтения отзывов при создании,
+    изменении, переносе на другой товар, удалении и каскадном удалении отзывов
+    и совпадают с пересчитанными с нуля.
+    """
+    first, second = product_factory(_quantity=2)
+    users = user_factory(_quantity=3)
+    reviews = [product_review_factory(user=user, product=first, rating=rating) for user, rating in zip(users, (5, 4, 1))]
+    after_create = get_rating_aggregates()
+
+    with CaptureQueriesContext(connection) as queries:
+        reviews[0].rating = 2
+        reviews[0].save()
+    after_update = get_rating_aggregates()
+    reviews[1].product = second
+    reviews[1].save()
+    after_move = get_rating_aggregates()
+    reviews[2].delete()
+    users[0].delete()
+    after_delete = get_rating_aggregates()
+    rebuild_product_ratings()
+
+    assert after_create == [(first.id, 10, 3, decimal.Decimal('3.33')), (second.id, 0, 0, None)]
+    assert after_update == [(first.id, 7, 3, decimal.Decimal('2.33')), (second.id, 0, 0, None)]
+    assert after_move == [(first.id, 3, 2, decimal.Decimal('1.50')), (second.id, 4, 1, decimal.Decimal('4.00'))]
+    assert after_delete == [(first.id, 0, 0, None), (second.id, 4, 1, decimal.Decimal('4.00'))]
+    assert get_rating_aggregates() == after_delete
+    product_updates = [
+        query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE "api_store_product" ')
+    ]
+    assert len(product_updates) == 1 and 'api_store_productreview' not in product_updates[0]
+
+
+@pytest.mark.django_db
+def test_product_review_create_constraints(api_client, product_factory, user_factory):
+    """
+    Тест на то, что создание отзыва не проверяет товар и повтор отдельными запросами,
+    а ошибки ограничений базы возвращаются прежними сообщениями.
+    """
+    product = product_factory()
+    api_client.force_authenticate(user=user_factory())
+    url = reverse('product-reviews-list')
+
+    with CaptureQueriesContext(connection) as queries:
+        resp = api_client.post(url, {'product_id': product.id, 'text': 'text', 'rating': 5}, format='json')
+    review_queries = [query['sql'] for query in queries.captured_queries if 'api_store_productreview' in query['sql']]
+    resp_duplicate = api_client.post(url, {'product_id': product.id, 'text': 'text', 'rating': 4}, format='json')
+    resp_unknown = api_client.post(url, {'product_id': product.id + 100, 'text': 'text', 'rating': 4}, format='json')
+    resp_missing = api_client.post(url, {'text': 'text', 'rating': 4}, format='json')
+
+    assert resp.status_code == HTTP_201_CREATED
+    assert resp.json()['product']['id'] == product.id
+    assert review_queries[0].startswith('INSERT INTO "api_store_productreview"')
+    assert resp_duplicate.json() == ['Пользователь уже оставил отзыв на этот товар']
+    assert resp_unknown.json() == {'non_field_errors': ['Товара с таким ID не существует']}
+    assert resp_missing.status_code == HTTP_400_BAD_REQUEST
+    assert ProductReview.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_product_review_upsert(api_client, product_factory, user_factory):
+    """
+    Тест создания и обновления отзыва пользователя на товар через PUT по товару.
+    """
+    product = product_factory()
+    api_client.force_authenticate(user=user_factory())
+    url = reverse('product-reviews-upsert', args=(product.id,))
+
+    resp_created = api_client.put(url, {'text': 'first', 'rating': 5}, format='json')
+    resp_updated = api_client.put(url, {'text': 'second', 'rating': 1}, format='json')
+    resp_unknown = api_client.put(
+        reverse('product-reviews-upsert', args=(product.id + 100,)), {'text': 'text', 'rating': 1}, format='json',
+    )
+    product.refresh_from_db()
+
+    assert resp_created.status_code == HTTP_201_CREATED
+    assert resp_updated.status_code == HTTP_200_OK
+    assert resp_updated.json()['id'] == resp_created.json()['id']
+    assert resp_updated.json()['text'] == 'second'
+    assert resp_unknown.status_code == HTTP_400_BAD_REQUEST
+    assert (product.reviews_count, product.rating_avg) == (1, 1)
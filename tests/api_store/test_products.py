@@ -1,7 +1,10 @@
+import csv
 import decimal
+import io
 import pytest
 from django.urls import reverse
-from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_403_FORBIDDEN, HTTP_204_NO_CONTENT
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_403_FORBIDDEN, HTTP_204_NO_CONTENT, \
+    HTTP_304_NOT_MODIFIED
 import random
 from django.contrib.auth.models import User
 from api_store.models import Product
@@ -175,3 +178,177 @@ def test_product_filter_price(api_client, product_factory):
     assert result_set_min_price == expected_set_min_price
     assert resp_max.status_code == HTTP_200_OK
     assert result_set_max_price == expected_set_max_price
+
+
+@pytest.mark.django_db
+def test_product_list_keyset_pagination(api_client, product_factory):
+    """
+    Тест keyset-пагинации списка продуктов: обход всех страниц по ссылке next.
+    """
+    products = product_factory(_quantity=7)
+    expected_ids = [product.id for product in sorted(
+        products, key=lambda p: (p.updated_at, p.created_at, p.id), reverse=True
+    )]
+    url = reverse('products-list')
+
+    result_ids = []
+    pages = 0
+    resp = api_client.get(url, {'page_size': 3})
+    while True:
+        assert resp.status_code == HTTP_200_OK
+        page = resp.json()
+        assert len(page['results']) <= 3
+        result_ids.extend(product['id'] for product in page['results'])
+        pages += 1
+        if page['next'] is None:
+            break
+        resp = api_client.get(page['next'])
+
+    assert pages == 3
+    assert result_ids == expected_ids
+
+
+def get_all_pages(api_client, url, params):
+    resp = api_client.get(url, params)
+    result_ids = []
+    while True:
+        assert resp.status_code == HTTP_200_OK
+        page = resp.json()
+        result_ids.extend(product['id'] for product in page['results'])
+        if page['next'] is None:
+            return result_ids
+        resp = api_client.get(page['next'])
+
+
+@pytest.mark.django_db
+def test_product_list_keyset_pagination_ordering(api_client, product_factory, product_review_factory):
+    """
+    Тест keyset-пагинации вместе с ?ordering: страницы идут в порядке сортировки,
+    одинаковые значения и NULL не теряются и не повторяются.
+    """
+    products = [product_factory(price=price) for price in (3, 1, 5, 1, 4, 3)]
+    for product, rating in zip(products[:3], (2, 5, 5)):
+        product_review_factory(product=product, rating=rating)
+    url = reverse('products-list')
+    expected_price_ids = [product.id for product in sorted(products, key=lambda p: (p.price, -p.id))]
+    expected_rating_ids = [products[2].id, products[1].id, products[0].id] + sorted(
+        (product.id for product in products[3:]), reverse=True,
+    )
+
+    price_ids = get_all_pages(api_client, url, {'ordering': 'price', 'page_size': 2})
+    rating_ids = get_all_pages(api_client, url, {'ordering': '-rating_avg', 'page_size': 2})
+
+    assert price_ids == expected_price_ids
+    assert rating_ids == expected_rating_ids
+
+
+@pytest.mark.django_db
+def test_product_search(api_client, product_factory):
+    """
+    Тест полнотекстового поиска продуктов: совпадения в названии выше совпадений в описании.
+    """
+    in_name = product_factory(name='Smartphone Honor', description='black')
+    in_description = product_factory(name='Case', description='case for smartphone')
+    product_factory(name='Laptop', description='gaming laptop')
+    url = reverse('products-list')
+
+    resp = api_client.get(url, {'q': 'smartphone'})
+    result_ids = [product['id'] for product in resp.json()]
+
+    assert resp.status_code == HTTP_200_OK
+    assert result_ids == [in_name.id, in_description.id]
+
+
+@pytest.mark.django_db
+def test_product_search_keyset_pagination(api_client, product_factory):
+    """
+    Тест постраничного поиска: страницы идут по релевантности, а не по дате обновления.
+    """
+    in_name = product_factory(_quantity=2, name='Smartphone Honor', description='black')
+    in_description = product_factory(_quantity=3, name='Case', description='case for smartphone')
+    product_factory(name='Laptop', description='gaming laptop')
+    url = reverse('products-list')
+
+    result_ids = get_all_pages(api_client, url, {'q': 'smartphone', 'page_size': 2})
+
+    assert result_ids == [product.id for product in reversed(in_name)] + [
+        product.id for product in reversed(in_description)
+    ]
+
+
+@pytest.mark.django_db
+def test_product_filter_rating(api_client, product_factory, product_review_factory):
+    """
+    Тест фильтра и сортировки продуктов по средней оценке.
+    """
+    low, high, without_reviews = product_factory(_quantity=3)
+    product_review_factory(product=low, rating=2)
+    product_review_factory(product=high, rating=5)
+    product_review_factory(product=high, rating=4)
+    url = reverse('products-list')
+
+    resp_filter = api_client.get(url, {'min_rating': 3})
+    resp_ordering = api_client.get(url, {'min_reviews_count': 1, 'ordering': '-rating_avg'})
+
+    assert resp_filter.status_code == HTTP_200_OK
+    assert [product['id'] for product in resp_filter.json()] == [high.id]
+    assert [product['id'] for product in resp_ordering.json()] == [high.id, low.id]
+
+
+@pytest.mark.django_db
+def test_product_export_csv(api_client, product_factory):
+    """
+    Тест потоковой выгрузки продуктов в CSV с фильтром по цене.
+    """
+    product_factory(_quantity=3, price=100)
+    expensive = product_factory(_quantity=2, price=1000)
+    url = reverse('products-list')
+
+    resp = api_client.get(url, {'format': 'csv', 'min_price': 500})
+    rows = list(csv.DictReader(io.StringIO(b''.join(resp.streaming_content).decode())))
+
+    assert resp.status_code == HTTP_200_OK
+    assert {int(row['id']) for row in rows} == {product.id for product in expensive}
+    assert all(decimal.Decimal(row['price']) == 1000 for row in rows)
+
+
+@pytest.mark.django_db
+def test_product_response_cache(api_client, product_factory, django_assert_num_queries):
+    """
+    Тест кэша ответов для анонимных пользователей: повторный запрос без обращений к базе,
+    304 по ETag и сброс кэша после изменения товара.
+    """
+    product = product_factory(price=100)
+    url = reverse('products-detail', args=(product.id,))
+
+    resp_first = api_client.get(url)
+    with django_assert_num_queries(0):
+        resp_cached = api_client.get(url)
+    resp_not_modified = api_client.get(url, HTTP_IF_NONE_MATCH=resp_first['ETag'])
+    product.price = 200
+    product.save()
+    resp_changed = api_client.get(url, HTTP_IF_NONE_MATCH=resp_first['ETag'])
+
+    assert resp_first.status_code == HTTP_200_OK
+    assert resp_cached.json() == resp_first.json()
+    assert resp_not_modified.status_code == HTTP_304_NOT_MODIFIED
+    assert resp_changed.status_code == HTTP_200_OK
+    assert decimal.Decimal(resp_changed.json()['price']) == 200
+
+
+@pytest.mark.django_db
+def test_product_response_cache_delete(api_client, product_factory):
+    """
+    Тест на то, что после удаления товара условный запрос списка получает новый список, а не 304.
+    """
+    kept, deleted = product_factory(_quantity=2)
+    url = reverse('products-list')
+
+    resp_first = api_client.get(url)
+    deleted.delete()
+    resp_after_delete = api_client.get(
+        url, HTTP_IF_NONE_MATCH=resp_first['ETag'], HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT',
+    )
+
+    assert resp_after_delete.status_code == HTTP_200_OK
+    assert [product['id'] for product in resp_after_delete.json()] == [kept.id]
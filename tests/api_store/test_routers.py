@@ -0,0 +1,141 @@
+import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED
+from api_store.models import Order, Product
+from api_store.routers import ReplicaRouter, replica_reads
+
+
+@pytest.fixture
+def replica(settings):
+    """
+    Фикстура реплики: отдельный алиас replica - второе соединение с той же тестовой базой
+    (как TEST MIRROR). Соединение replica не видит незафиксированных данных default,
+    поэтому тесты с ней используют transaction=True.
+    """
+    connections.settings['replica'] = {
+        **connections['default'].settings_dict,
+        'TEST': {**connections['default'].settings_dict['TEST'], 'MIRROR': 'default'},
+    }
+    settings.DATABASE_REPLICAS = ['replica']
+    yield
+    connections['replica'].close()
+    del connections['replica']
+    del connections.settings['replica']
+
+
+class CaptureAliases:
+    """
+    Чтения таблиц по алиасам default и replica.
+    """
+
+    def __init__(self):
+        self.contexts = {alias: CaptureQueriesContext(connections[alias]) for alias in ('default', 'replica')}
+
+    def __enter__(self):
+        for context in self.contexts.values():
+            context.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        for context in self.contexts.values():
+            context.__exit__(*exc_info)
+        # Копия: следующий запрос тестового клиента очищает журналы запросов соединений.
+        self.queries = {alias: list(context.captured_queries) for alias, context in self.contexts.items()}
+
+    def selects(self, alias, table):
+        return [
+            query['sql'] for query in self.queries[alias]
+            # На PostgreSQL iterator() читает через серверный курсор: DECLARE ... FOR SELECT.
+            if query['sql'].startswith(('SELECT', 'DECLARE')) and f'FROM "{table}"' in query['sql']
+        ]
+
+
+def test_router_routes_only_marked_reads(settings):
+    """
+    Тест роутера: чтение уходит на реплики только внутри помеченного запроса, запись - всегда на default.
+    """
+    settings.DATABASE_REPLICAS = ['replica_1', 'replica_2']
+    router = ReplicaRouter()
+
+    outside = router.db_for_read(Product)
+    token = replica_reads.set(True)
+    inside = router.db_for_read(Product)
+    write_inside = router.db_for_write(Order)
+    replica_reads.reset(token)
+
+    assert outside is None
+    assert inside in {'replica_1', 'replica_2'}
+    assert write_inside == 'default'
+    assert router.allow_migrate('replica_1', 'api_store') is False
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replica_reads_and_stickiness(api_client, product_factory, user_factory, replica):
+    """
+    Тест: чтение отзывов идёт на реплику, после создания отзыва пользователь
+    читает отзывы с основной базы.
+    """
+    product = product_factory()
+    api_client.force_authenticate(user=user_factory())
+    url = reverse('product-reviews-list')
+
+    with CaptureAliases() as before_write:
+        resp_before_write = api_client.get(url)
+    resp_create = api_client.post(url, {'product_id': product.id, 'text': 'text', 'rating': 5}, format='json')
+    with CaptureAliases() as after_write:
+        resp_after_write = api_client.get(url)
+
+    assert resp_before_write.status_code == HTTP_200_OK
+    assert before_write.selects('replica', 'api_store_productreview')
+    assert not before_write.selects('default', 'api_store_productreview')
+    assert resp_create.status_code == HTTP_201_CREATED
+    assert resp_after_write.status_code == HTTP_200_OK
+    assert after_write.selects('default', 'api_store_productreview')
+    assert not after_write.selects('replica', 'api_store_productreview')
+    assert [review['product']['id'] for review in resp_after_write.json()] == [product.id]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replica_reads_streaming_export(api_client, product_factory, replica):
+    """
+    Тест на то, что потоковая выгрузка товаров читается с реплики и при чтении тела ответа.
+    """
+    product_factory(_quantity=3)
+
+    with CaptureAliases() as queries:
+        resp = api_client.get(reverse('products-list'), {'format': 'ndjson'})
+        lines = b''.join(resp.streaming_content).splitlines()
+
+    assert resp.status_code == HTTP_200_OK
+    assert len(lines) == 3
+    assert queries.selects('replica', 'api_store_product')
+    assert not queries.selects('default', 'api_store_product')
+    assert replica_reads.get() is False
+
+
+@pytest.mark.django_db(transaction=True)
+def test_response_cache_miss_reads_primary(api_client, product_factory, replica):
+    """
+    Тест на то, что анонимный ответ, который кладётся в кэш, строится с основной базы,
+    а попадание в кэш не обращается ни к одной базе.
+    """
+    product = product_factory()
+    url = reverse('products-detail', args=(product.id,))
+
+    with CaptureAliases() as miss:
+        resp_miss = api_client.get(url)
+    with CaptureAliases() as hit:
+        resp_hit = api_client.get(url)
+    product.name = 'renamed'
+    product.save()
+    with CaptureAliases() as miss_after_change:
+        resp_after_change = api_client.get(url)
+
+    assert resp_miss.status_code == resp_hit.status_code == HTTP_200_OK
+    assert miss.selects('default', 'api_store_product') and not miss.selects('replica', 'api_store_product')
+    assert not hit.selects('default', 'api_store_product') and not hit.selects('replica', 'api_store_product')
+    assert resp_after_change.json()['name'] == 'renamed'
+    assert miss_after_change.selects('default', 'api_store_product')
+    assert not miss_after_change.selects('replica', 'api_store_product')
@@ -0,0 +1,72 @@
+import datetime
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from api_store.models import Order, Position, Product, ProductCollection, ProductReview
+
+
+def get_snapshot():
+    return (
+        list(Product.objects.order_by('id').values_list('name', 'price', 'reviews_count')),
+        list(Position.objects.order_by('id').values_list('quantity', flat=True)),
+        list(Order.objects.order_by('id').values_list('status', 'total_amount', 'created_at')),
+    )
+
+
+@pytest.mark.django_db
+def test_seed_store():
+    """
+    Тест на то, что seed_store создаёт связанные данные с согласованными суммами и агрегатами отзывов.
+    """
+    call_command('seed_store', users=20, products=50, orders=100, reviews=80, collections=5, batch_size=30,
+                 stdout=StringIO())
+    order = Order.objects.prefetch_related('positions__product').first()
+
+    assert User.objects.filter(username__startswith='seed_0_').count() == 20
+    assert Product.objects.count() == 50
+    assert Order.objects.count() == 100
+    assert 0 < ProductReview.objects.count() <= 80
+    assert ProductCollection.objects.count() == 5
+    assert ProductCollection.products.through.objects.count() >= 25
+    assert order.total_amount == sum(position.product.price * position.quantity for position in order.positions.all())
+    assert sum(Product.objects.values_list('reviews_count', flat=True)) == ProductReview.objects.count()
+    assert Order.objects.dates('created_at', 'day').count() > 1
+
+
+@pytest.mark.django_db
+def test_seed_store_deterministic():
+    """
+    Тест на то, что при одинаковом seed данные повторяются, а повторный запуск с тем же seed запрещён.
+    """
+    options = {'users': 10, 'products': 30, 'orders': 40, 'reviews': 30, 'collections': 2,
+               'stdout': StringIO()}
+    call_command('seed_store', **options)
+    first = get_snapshot()
+
+    with pytest.raises(CommandError):
+        call_command('seed_store', **options)
+
+    Product.objects.all().delete()
+    User.objects.all().delete()
+    call_command('seed_store', **options)
+
+    assert get_snapshot() == first
+
+
+@pytest.mark.django_db
+def test_seed_store_now():
+    """
+    Тест на то, что даты распределяются за --days дней до --now.
+    """
+    call_command('seed_store', users=5, products=10, orders=30, reviews=0, collections=0, days=10,
+                 now='2021-03-10T12:00:00+00:00', stdout=StringIO())
+    now = datetime.datetime(2021, 3, 10, 12, tzinfo=datetime.timezone.utc)
+
+    assert all(
+        now - datetime.timedelta(days=10) <= created_at <= now
+        for created_at in Order.objects.values_list('created_at', flat=True)
+    )
+    with pytest.raises(CommandError):
+        call_command('seed_store', seed=1, now='вчера', stdout=StringIO())
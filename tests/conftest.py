@@ -1,8 +1,20 @@
+import random
 import pytest
+from django.core.cache import cache
 from model_bakery import baker
 from rest_framework.test import APIClient
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    Фикстура очистки кэша между тестами: база откатывается, кэш - нет.
+    """
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def api_client():
     """
@@ -47,6 +59,7 @@ def product_review_factory():
     Фикстура для фабрики отзывов.
     """
     def factory(**kwargs):
+        kwargs.setdefault('rating', lambda: random.randint(1, 5))
         return baker.make('ProductReview', **kwargs)
     return factory
 
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+from benchmarks.replay import get_endpoint, get_path, parse_http_file, percentile
+from benchmarks.suite import compare, run_suite
+
+
+@pytest.mark.django_db
+def test_benchmark_suite_smoke():
+    """
+    Тест прогона набора бенчмарков на маленьком объёме данных и сравнения с baseline.
+    """
+    results = run_suite(sizes=(5,), repeat=1)
+    by_name = {(item['name'], item['size']): item for item in results}
+    slower = [dict(item, wall_ms={**item['wall_ms'], 'median': item['wall_ms']['median'] * 10}) for item in results]
+
+    assert by_name[('fast_order_serializer_list', 5)]['queries'] == 3
+    assert by_name[('product_filter_query', None)]['queries'] == 0
+    assert by_name[('order_serializer_create', 1)]['queries'] == by_name[('order_serializer_create', 50)]['queries']
+    assert compare(results, results, threshold=1.2) == []
+    assert len(compare(slower, results, threshold=1.2)) == len(results)
+
+
+def test_replay_parse_http_file():
+    """
+    Тест разбора requests-examples.http и нормализации endpoint для отчёта прогона.
+    """
+    with open('requests-examples.http', encoding='utf-8') as http_file:
+        requests = parse_http_file(http_file.read())
+    create_order = next(item for item in requests if item['method'] == 'POST' and '/orders/' in item['url'])
+
+    assert len(requests) > 10
+    assert create_order['headers']['Content-Type'] == 'application/json'
+    assert 'Authorization' in create_order['headers']
+    assert json.loads(create_order['body'])
+    assert get_path('localhost:8000/api/v1/orders/?status=NEW') == '/api/v1/orders/?status=NEW'
+    assert get_endpoint('PATCH', '/api/v1/orders/36/') == 'PATCH /api/v1/orders/{id}/'
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile(list(range(1, 101)), 99) == 99